@@ -0,0 +1,53 @@
+# aggregates.py
+"""
+SQL-side aggregation for dashboard KPIs and charts
+- GROUP BY / COUNT / SUM run inside SQLite and only the small result
+  comes back to Python
+- count_by on an indexed column is answered from the index alone; enum
+  codes are translated to their names after grouping
+"""
+
+import re
+
+import pandas as pd
+
+import schema
+
+
+def count(conn, table) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def count_by(conn, table, column) -> pd.Series:
+    """Like df[column].value_counts(): non-null values, most frequent first."""
+    rows = conn.execute(
+        f"SELECT {column}, COUNT(*) AS n FROM {table} WHERE {column} IS NOT NULL "
+        f"GROUP BY {column} ORDER BY n DESC"
+    ).fetchall()
+    enum = schema.enum_of(table, column)
+    if enum:
+        names = schema.labels(conn, enum)
+        rows = [(names.get(code, code), n) for code, n in rows]
+    return pd.Series(dict(rows), name="count", dtype="int64").rename_axis(column)
+
+
+def count_matching(conn, table, column, pattern) -> int:
+    """
+    Rows whose column contains the regex pattern (case-insensitive), like
+    df[column].str.contains(pattern, case=False). The regex is applied to
+    the grouped distinct values, not to every row.
+    """
+    return matching(count_by(conn, table, column), pattern)
+
+
+def matching(counts, pattern) -> int:
+    """Sum of the counts (a count_by result) whose value contains the regex pattern."""
+    regex = re.compile(pattern, re.IGNORECASE)
+    return int(sum(n for value, n in counts.items() if regex.search(str(value))))
+
+
+def total(conn, table, column):
+    """SUM of the numeric values in column (text that isn't a number is ignored)."""
+    return conn.execute(
+        f"SELECT COALESCE(SUM(CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} END), 0) FROM {table}"
+    ).fetchone()[0]
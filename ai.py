@@ -3,13 +3,22 @@
 # Multi-Domain Intelligent Assistant: Cybersecurity | Data Science | IT Operations
 # ═══════════════════════════════════════════════════════════
 
+import time
+
 import streamlit as st
-import google.generativeai as genai
+
+import startup
+
+from response_cache import ResponseCache, make_key
+from context_window import fit_window
+from db_pool import get_pool
+from retrieval import RetrievalIndex, context_for
+from dispatcher import Dispatcher
 
 # ------------------- CONFIGURATION -------------------
 # Securely load your Gemini API key
 try:
-    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+    GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
 except Exception as e:
     st.error("Gemini API Key not found! Add it to .streamlit/secrets.toml")
     st.stop()
@@ -39,6 +48,33 @@ Focus on practical, real-world solutions.
     """
 }
 
+@st.cache_resource
+def gemini():
+    # the SDK is imported and configured once per server process, not on every rerun
+    genai = startup.timed_import("google.generativeai")
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+@st.cache_resource
+def gemini_model(domain):
+    # one model per expert, shared by every session
+    return gemini().GenerativeModel(model_name=GEMINI_MODEL, system_instruction=DOMAIN_PROMPTS[domain])
+
+@st.cache_resource
+def response_cache():
+    # shared across sessions and with website.py (disk tier in ai_cache.db)
+    return ResponseCache()
+
+@st.cache_resource
+def retrieval_index():
+    # grounding: top matching incidents / tickets from intelligence_platform.db
+    return RetrievalIndex()
+
+@st.cache_resource
+def dispatcher():
+    # rate limits (free tier), retries and dedup for every Gemini request
+    return Dispatcher()
+
 # ------------------- PAGE CONFIG -------------------
 st.set_page_config(page_title="Multi-Domain AI Platform", page_icon="Brain", layout="wide")
 st.title("Multi-Domain Intelligence Platform")
@@ -59,41 +95,43 @@ with st.sidebar:
     st.caption(f"**Current Expert:** {selected_domain}")
 
     # Message counter
-    if "chat" in st.session_state:
-        msg_count = len([m for m in st.session_state.chat.history if m.role != "model"])
+    if "transcript" in st.session_state:
+        msg_count = len([t for t in st.session_state.transcript if t[0] != "model"])
         st.metric("Messages in Chat", msg_count)
     else:
         st.metric("Messages in Chat", 0)
+    st.metric("Prompt Tokens (last)", st.session_state.get("prompt_tokens", 0))
+
+    # Response cache
+    cache_stats = response_cache().stats()
+    st.metric("Cache Hit Ratio", f"{cache_stats['hit_ratio']:.0%}")
+    st.metric("Latency Saved", f"{cache_stats['saved_ms'] / 1000:.1f} s")
+    gemini_stats = dispatcher().stats().get("gemini")
+    if gemini_stats:
+        st.metric("Gemini p95 Latency", f"{gemini_stats['p95_ms']:.0f} ms")
+        st.caption(f"Queued: {gemini_stats['queued']} · retries: {gemini_stats['retries']} · circuit: {gemini_stats['circuit']}")
+    with st.expander("Startup import times"):
+        st.json(startup.report())
 
     # Clear chat button
     if st.button("Clear Chat History", use_container_width=True, type="primary"):
-        st.session_state.chat = st.session_state.model.start_chat(history=[])
+        st.session_state.chat = gemini_model(selected_domain).start_chat(history=[])
+        st.session_state.transcript = []
         st.success("Chat cleared!")
         st.rerun()
 
 # ------------------- INITIALIZE MODEL & CHAT -------------------
-# Re-create model only when domain changes
+# Start a fresh chat when the domain changes (models are cached per domain)
 if ("last_domain" not in st.session_state or
         st.session_state.last_domain != selected_domain):
-    model = genai.GenerativeModel(
-        model_name=GEMINI_MODEL,
-        system_instruction=DOMAIN_PROMPTS[selected_domain]
-    )
-
-    # Start fresh chat with new expert
-    st.session_state.model = model
-    st.session_state.chat = model.start_chat(history=[])
+    st.session_state.chat = gemini_model(selected_domain).start_chat(history=[])
+    st.session_state.transcript = []  # full conversation [(role, text)] for display
     st.session_state.last_domain = selected_domain
 
 # ------------------- DISPLAY CHAT HISTORY -------------------
-for message in st.session_state.chat.history:
-    role = "user" if message.role == "user" else "assistant"
-    with st.chat_message(role):
-        # Gemini stores text in parts[0].text
-        try:
-            st.markdown(message.parts[0].text)
-        except:
-            st.markdown("...")
+for role, text in st.session_state.transcript:
+    with st.chat_message("user" if role == "user" else "assistant"):
+        st.markdown(text or "...")
 
 # ------------------- USER INPUT -------------------
 if prompt := st.chat_input(f"Ask the {selected_domain} anything..."):
@@ -101,21 +139,49 @@ if prompt := st.chat_input(f"Ask the {selected_domain} anything..."):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    # Same domain + same conversation so far + same question -> cached reply
+    turns = st.session_state.transcript + [("user", prompt)]
+    try:
+        records = context_for(retrieval_index(), get_pool("intelligence_platform.db"), prompt)
+    except Exception:
+        records = ""  # database not initialised yet: answer ungrounded
+    cache_key = make_key(GEMINI_MODEL, DOMAIN_PROMPTS[selected_domain] + records, turns)
+    cached_reply = response_cache().get(cache_key)
+
+    # Only a token-budgeted window of the conversation is sent; older turns become a summary
+    summary, kept, ctx = fit_window(DOMAIN_PROMPTS[selected_domain] + records, turns)  # records count against the budget
+    history = [{"role": "user", "parts": [summary]}, {"role": "model", "parts": ["Understood."]}] if summary else []
+    history += [{"role": role, "parts": [text]} for role, text in kept[:-1]]
+    st.session_state.chat = gemini_model(selected_domain).start_chat(history=history)
+    st.session_state.prompt_tokens = ctx["prompt_tokens"]
+
     # Send to Gemini with streaming
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
         full_response = ""
 
-        try:
-            response = st.session_state.chat.send_message(prompt, stream=True)
-            for chunk in response:
-                if chunk.text:
-                    full_response += chunk.text
-                    message_placeholder.markdown(full_response + "▌")
-            message_placeholder.markdown(full_response)
-        except Exception as e:
-            st.error(f"Gemini API Error: {e}")
-            st.info("Check your internet or API key.")
+        if cached_reply is not None:
+            message_placeholder.markdown(cached_reply)
+            st.caption("Answered from cache")
+            st.session_state.transcript += [("user", prompt), ("model", cached_reply)]
+        else:
+            try:
+                started = time.perf_counter()
+                message = f"{records}\n\nQuestion: {prompt}" if records else prompt
+                chat = st.session_state.chat
+                response = dispatcher().stream("gemini", lambda: chat.send_message(message, stream=True), key=cache_key)
+                for chunk in response:
+                    if chunk.text:
+                        full_response += chunk.text
+                        message_placeholder.markdown(full_response + "▌")
+                message_placeholder.markdown(full_response)
+                response_cache().put(cache_key, full_response, 1000 * (time.perf_counter() - started))
+                st.session_state.transcript += [("user", prompt), ("model", full_response)]
+                st.caption(f"Prompt ≈ {ctx['prompt_tokens']} tokens"
+                           + (f" ({ctx['summarized_turns']} earlier turns summarized)" if ctx["summarized_turns"] else ""))
+            except Exception as e:
+                st.error(f"Gemini API Error: {e}")
+                st.info("Check your internet or API key.")
 
 # ------------------- FOOTER -------------------
 st.markdown("---")
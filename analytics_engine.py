@@ -0,0 +1,339 @@
+# analytics_engine.py
+"""
+Partitioned TicketAnalytics aggregation over large ticket CSVs
+- the CSV is split into shards of ~SHARD_BYTES at line boundaries; a
+  boundary depends only on the bytes before it, so when the file grows
+  (appended rows) every full shard keeps its byte range and only the tail
+  shard and new shards change
+- each shard is parsed (just the three columns the dashboard needs) and
+  reduced to a partial aggregate per (assigned_to, status, resolution
+  bucket): sum and count of resolution hours plus row count; the counts
+  per bucket are a quantile sketch (sketches.py) per staff and status;
+  shards run in worker processes
+- the workers are `python analytics_engine.py --worker` processes fed over
+  pipes, not a multiprocessing pool: spawn / forkserver children re-run
+  the parent's __main__, which under Streamlit is the page script
+- partials are cached by a hash of the shard's bytes, in memory and (with
+  pyarrow) as feather files next to the columnar cache, so only new or
+  changed shards are parsed again, also after a restart
+- partials merge by summing, and summarize_grouped() derives every KPI and
+  chart series from the merged frame (means = sum / count, p50 / p90 / p99
+  from the merged sketches)
+- operatios.TicketAnalytics only uses this for files over 2 * SHARD_BYTES;
+  smaller ones take its in-process load_data() + summarize() path
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import sketches
+from columnar_cache import CACHE_DIRNAME, feather
+
+SHARD_BYTES = 64 << 20  # ~700k ticket rows
+MAX_CACHED = 4096       # partials kept in memory
+KEYS = ["assigned_to", "status"]
+VALUE = "resolution_time_hours"
+AGGS = ["sum", "count", "size"]
+LEVELS = KEYS + ["bucket"]
+PARTIAL_VERSION = "3"  # bump when partial()'s layout changes (invalidates cached partials)
+
+
+# ---------- aggregation (shared with operatios.TicketAnalytics) ----------
+def partial(df) -> pd.DataFrame:
+    """Per (assigned_to, status, resolution bucket): sum and count of resolution hours, and rows."""
+    buckets = sketches.bucket(df[VALUE]).rename("bucket")
+    return df.groupby([df[k] for k in KEYS] + [buckets], observed=True, dropna=False)[VALUE].agg(AGGS)
+
+
+def merge(partials) -> pd.DataFrame:
+    """Combine partial() results of disjoint row sets."""
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame(columns=AGGS, index=pd.MultiIndex.from_arrays([[], [], []], names=LEVELS))
+    return pd.concat(partials).groupby(level=LEVELS, dropna=False).sum()
+
+
+def summarize_grouped(grouped) -> dict:
+    """
+    Every KPI and chart series from the per (assigned_to, status, bucket) partial.
+    Per-group sum/count of resolution hours give the means, size gives the
+    ticket counts and the per-bucket counts give the percentiles.
+    """
+    status_sizes = grouped['size'].groupby(level='status', observed=True).sum()
+    status_lower = status_sizes.groupby(status_sizes.index.astype(str).str.lower()).sum()
+
+    by_staff = grouped.groupby(level='assigned_to', observed=True).sum()
+    by_status = grouped.groupby(level='status', observed=True).sum()
+
+    avg_by_staff = (by_staff['sum'] / by_staff['count']).rename('resolution_time_hours')
+    avg_by_status = (by_status['sum'] / by_status['count']).rename('resolution_time_hours')
+    return {
+        'total': int(grouped['size'].sum()),
+        'open': int(status_lower.get('open', 0)),
+        'waiting_user': int(status_lower.get('waiting for user', 0)),
+        'resolved': int(status_lower.get('resolved', 0)),
+        'avg_by_staff': avg_by_staff.sort_values(ascending=False),
+        'avg_by_status': avg_by_status.sort_values(ascending=False),
+        'count_by_staff': by_staff['size'].rename('ticket_count').sort_values(ascending=False),
+        'pct_by_staff': sketches.percentile_table(grouped['count'], 'assigned_to'),
+        'pct_by_status': sketches.percentile_table(grouped['count'], 'status'),
+    }
+
+
+# ---------- shards ----------
+def read_header(path):
+    """Normalized column names (stripped, lower case) and the offset where rows start."""
+    with open(path, "rb") as f:
+        line = f.readline()
+    names = [c.strip().lower() for c in line.decode("utf-8").rstrip("\r\n").split(",")]
+    return names, len(line)
+
+
+def shards(path, shard_bytes=SHARD_BYTES):
+    """[(start, end)] byte ranges of whole lines covering the file's complete rows."""
+    size = os.path.getsize(path)
+    _, start = read_header(path)
+    ranges = []
+    with open(path, "rb") as f:
+        while start < size:
+            f.seek(start + shard_bytes - 1)  # end just past the first newline at or after the target
+            f.readline()
+            end = min(f.tell(), size)
+            if end == size:
+                f.seek(max(start, size - 1))
+                if f.read(1) != b"\n":  # unfinished last row: leave it for the next run
+                    f.seek(start)
+                    end = start + f.read(size - start).rfind(b"\n") + 1
+                if end <= start:
+                    break
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def shard_digest(path, start, end, names):
+    """Hash of the shard's bytes, the header they are parsed with and PARTIAL_VERSION."""
+    h = hashlib.blake2b(",".join(names).encode(), digest_size=16, salt=PARTIAL_VERSION.encode())
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+
+def shard_partial(path, start, end, names) -> pd.DataFrame:
+    """Parse one shard and reduce it (runs in a worker process)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=KEYS + [VALUE],
+                     dtype={k: str for k in KEYS}, on_bad_lines='skip')
+    for k in KEYS:
+        df[k] = df[k].str.strip()
+    df[VALUE] = pd.to_numeric(df[VALUE], errors='coerce')
+    return partial(df)
+
+
+# ---------- worker processes ----------
+WORKER_CALLS = {"shard_partial": shard_partial}
+
+
+class WorkerDied(RuntimeError):
+    """A worker process exited (or its pipe broke) while running a shard."""
+
+
+class _Worker:
+    """One worker process: pickled (name, args) calls on its stdin, (ok, result) replies on its stdout."""
+
+    def __init__(self):
+        self.proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def call(self, name, *args):
+        try:
+            pickle.dump((name, args), self.proc.stdin)
+            self.proc.stdin.flush()
+            ok, result = pickle.load(self.proc.stdout)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            raise WorkerDied(f"analytics worker exited ({self.proc.poll()}): {e}") from None
+        if not ok:
+            raise result
+        return result
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def close(self):
+        try:
+            self.proc.stdin.close()  # the worker exits at end of input
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+
+
+def _serve():
+    """Worker loop: answer calls from stdin until it is closed (also when the parent dies)."""
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr  # a stray print must not corrupt the replies
+    while True:
+        try:
+            name, args = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = pickle.dumps((True, WORKER_CALLS[name](*args)))
+        except Exception as e:
+            try:
+                reply = pickle.dumps((False, e))
+            except Exception:
+                reply = pickle.dumps((False, RuntimeError(f"{type(e).__name__}: {e}")))
+        replies.write(reply)
+        replies.flush()
+
+
+class PartitionedAnalytics:
+    def __init__(self, workers=None, shard_bytes=SHARD_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_bytes = shard_bytes
+        self._threads = None  # started on the first multi-shard job
+        self._idle = queue.Queue()  # worker processes not running a shard
+        self._started = 0
+        self._lock = threading.Lock()
+        self._partials = OrderedDict()  # shard digest -> partial
+        self._last = {}  # path -> ((size, mtime_ns), merged) for unchanged files
+        self._stats = {"runs": 0, "shards": 0, "computed": 0, "memory_hits": 0, "disk_hits": 0, "last_s": 0.0}
+
+    def _pool(self):
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="analytics")
+            return self._threads
+
+    def _borrow(self):
+        with self._lock:
+            if self._idle.empty() and self._started < self.workers:
+                self._started += 1
+                return _Worker()  # started lazily, up to self.workers
+        return self._idle.get()
+
+    def _in_worker(self, path, start, end, names):
+        """shard_partial in a worker process (runs on one of the _pool threads)."""
+        worker = self._borrow()
+        try:
+            return worker.call("shard_partial", path, start, end, names)
+        finally:
+            if worker.alive():
+                self._idle.put(worker)
+            else:
+                with self._lock:
+                    self._started -= 1
+
+    def _disk_path(self, path, digest):
+        folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME, "partials")
+        return os.path.join(folder, f"{digest}.feather")
+
+    def _cached(self, path, digest):
+        with self._lock:
+            if digest in self._partials:
+                self._partials.move_to_end(digest)
+                self._stats["memory_hits"] += 1
+                return self._partials[digest]
+        disk = self._disk_path(path, digest)
+        if feather is not None and os.path.exists(disk):
+            try:
+                p = feather.read_feather(disk).set_index(LEVELS)
+            except (OSError, ValueError):
+                return None
+            self._remember(digest, p)
+            with self._lock:
+                self._stats["disk_hits"] += 1
+            return p
+        return None
+
+    def _remember(self, digest, p):
+        with self._lock:
+            self._partials[digest] = p
+            while len(self._partials) > MAX_CACHED:
+                self._partials.popitem(last=False)
+
+    def _store(self, path, digest, p):
+        self._remember(digest, p)
+        if feather is None:
+            return
+        disk = self._disk_path(path, digest)
+        try:
+            os.makedirs(os.path.dirname(disk), exist_ok=True)
+            tmp = f"{disk}.{os.getpid()}.tmp"
+            feather.write_feather(p.reset_index(), tmp)
+            os.replace(tmp, disk)
+        except OSError:
+            pass  # read-only data folder: memory cache only
+
+    def grouped(self, path) -> pd.DataFrame:
+        """Merged per (assigned_to, status, bucket) partial for the CSV at path."""
+        t0 = time.perf_counter()
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            last = self._last.get(path)
+        if last and last[0] == signature:
+            return last[1]
+
+        names, _ = read_header(path)
+        ranges = shards(path, self.shard_bytes)
+        digests = [shard_digest(path, s, e, names) for s, e in ranges]
+        results = {d: self._cached(path, d) for d in digests}
+        todo = [(r, d) for r, d in zip(ranges, digests) if results[d] is None]
+
+        if len(todo) > 1 and self.workers > 1:
+            futures = [(d, self._pool().submit(self._in_worker, path, s, e, names)) for (s, e), d in todo]
+            computed = [(d, f.result()) for d, f in futures]
+        else:
+            computed = [(d, shard_partial(path, s, e, names)) for (s, e), d in todo]
+        for d, p in computed:
+            self._store(path, d, p)
+            results[d] = p
+
+        merged = merge(results[d] for d in digests)
+        with self._lock:
+            self._last[path] = (signature, merged)
+            self._stats["runs"] += 1
+            self._stats["shards"] = len(ranges)
+            self._stats["computed"] += len(todo)
+            self._stats["last_s"] = time.perf_counter() - t0
+        return merged
+
+    def summarize(self, path) -> dict:
+        return summarize_grouped(self.grouped(path))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, worker_processes=self._started,
+                        cached_partials=len(self._partials))
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=True, cancel_futures=True)
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv[1:]:
+        _serve()
@@ -5,16 +5,36 @@ Secure Authentication & File Persistence
 - atomic writes for file persistence
 - simple username,hashed_password CSV: username,hashed_password
 - minimal, clear functions for register / login / change password
+- bulk-register (parallel hashing, one atomic commit) and export to the
+  intelligence_platform.db users table used by website.py
+- pluggable user store (AUTH_BACKEND):
+    log    - users.txt as an append-only log (O(1) appends, periodic compaction)
+             with a persistent username -> byte offset index in users.txt.idx
+             (O(log N) lookups; only lines appended since the last use are indexed)
+    sqlite - users.db with username as primary key (O(log N) lookups)
 """
 
 import os
+import csv
+import time
 import bcrypt
+import sqlite3
 import tempfile
 import argparse
 import getpass
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
 USERS_FILE = "users.txt"
+USERS_INDEX = USERS_FILE + ".idx"
+USERS_DB = "users.db"
+PLATFORM_DB = "intelligence_platform.db"
+EXPORT_BATCH = 5000
+AUTH_BACKEND = os.environ.get("AUTH_BACKEND", "log")
 BCRYPT_ROUNDS = 12  # cost factor; increase with time if needed
+COMPACT_MIN_LINES = 1000  # don't bother compacting small logs
+COMPACT_RATIO = 2  # compact once the log holds 2x more lines than live users
 
 
 def ensure_users_file():
@@ -46,24 +66,31 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+def parse_user_line(line):
+    """(username, hashed_password) from one users.txt line, or None if it isn't a record."""
+    line = line.strip()
+    if not line:
+        return None
+    # split only on the first comma to allow hashes that may include commas
+    try:
+        username, hashed = line.split(",", 1)
+    except ValueError:
+        return None
+    return username, hashed
+
+
 def load_users() -> dict:
     """
-    Load users from file.
+    Load users from file (a last line without "\n" counts like any other).
     Returns dict: {username: hashed_password}
     """
     ensure_users_file()
     users = {}
     with open(USERS_FILE, "r", encoding="utf-8") as f:
         for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            # split only on the first comma to allow hashes that may include commas
-            try:
-                username, hashed = line.split(",", 1)
-            except ValueError:
-                continue
-            users[username] = hashed
+            record = parse_user_line(line)
+            if record:
+                users[record[0]] = record[1]
     return users
 
 
@@ -93,31 +120,247 @@ def write_users_atomic(users: dict):
                 pass
 
 
-def register_user(username: str, password: str) -> bool:
+class LogUserStore:
     """
-    Register a new user.
-    Returns True on success, False if user exists or invalid input.
+    users.txt as an append-only log: a later line for a username overrides
+    earlier ones (load_users already reads it that way).
+    USERS_INDEX (SQLite) maps each username to the byte offset of its latest
+    line, so get() is one B-tree lookup plus one line read, and register /
+    change password append one fsynced line and update one index entry
+    (add_many appends all its lines with one fsync and one transaction). The
+    index remembers how far into which file it has read: lines appended by
+    other tools are indexed on the next open, and a replaced or shrunk file
+    (compaction, hand edits) is re-indexed. When superseded lines pile up,
+    compact() rewrites the file with write_users_atomic.
+    """
+
+    def __init__(self, index_path=None):
+        ensure_users_file()
+        index_path = index_path or USERS_INDEX
+        new_file = not os.path.exists(index_path)
+        self.conn = sqlite3.connect(index_path, timeout=30, isolation_level=None)
+        if new_file:
+            try:
+                os.chmod(index_path, 0o600)
+            except PermissionError:
+                pass
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        with self._locked():
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS offsets (username TEXT PRIMARY KEY, offset INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS log_state (id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " inode INTEGER, size INTEGER, lines INTEGER, users INTEGER)"
+            )
+            self.conn.execute("INSERT OR IGNORE INTO log_state VALUES (1, 0, 0, 0, 0)")
+            self._catch_up()
+
+    @contextmanager
+    def _locked(self):
+        """One write transaction on the index; it also serializes appenders across processes."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _state(self):
+        return self.conn.execute("SELECT inode, size, lines, users FROM log_state").fetchone()
+
+    def _index_lines(self, start, data, lines, users):
+        """Index the records in data (file bytes from offset start). Returns the new (lines, users)."""
+        offset = start
+        for raw in data.splitlines(keepends=True):
+            record = parse_user_line(raw.decode("utf-8", errors="replace"))
+            if record:
+                lines += 1
+                known = self.conn.execute("SELECT 1 FROM offsets WHERE username=?", (record[0],)).fetchone()
+                self.conn.execute("INSERT OR REPLACE INTO offsets VALUES (?,?)", (record[0], offset))
+                users += known is None
+            offset += len(raw)
+        return lines, users
+
+    def _catch_up(self, rebuild=False):
+        """Index whatever the file holds beyond what the index has seen (inside _locked)."""
+        inode, size, lines, users = self._state()
+        st = os.stat(USERS_FILE)
+        if rebuild or st.st_ino != inode or st.st_size < size:
+            self.conn.execute("DELETE FROM offsets")
+            size = lines = users = 0
+        if st.st_size > size:
+            with open(USERS_FILE, "rb") as f:
+                f.seek(size)
+                data = f.read()
+            lines, users = self._index_lines(size, data, lines, users)
+            size += len(data)
+        self.conn.execute("UPDATE log_state SET inode=?, size=?, lines=?, users=?", (st.st_ino, size, lines, users))
+
+    @staticmethod
+    def _read_at(offset):
+        with open(USERS_FILE, "rb") as f:
+            f.seek(offset)
+            return parse_user_line(f.readline().decode("utf-8", errors="replace"))
+
+    def get(self, username):
+        row = self.conn.execute("SELECT offset FROM offsets WHERE username=?", (username,)).fetchone()
+        record = self._read_at(row[0]) if row else None
+        if row and (record is None or record[0] != username):
+            # the file was edited in place since it was indexed
+            with self._locked():
+                self._catch_up(rebuild=True)
+            row = self.conn.execute("SELECT offset FROM offsets WHERE username=?", (username,)).fetchone()
+            record = self._read_at(row[0]) if row else None
+        return record[1] if record and record[0] == username else None
+
+    def _append(self, records, only_new=False) -> int:
+        """Append records (skipping existing usernames if only_new) under the index lock. Returns lines written."""
+        with self._locked():
+            self._catch_up()
+            if only_new:
+                seen = set()
+                records = [(u, h) for u, h in records
+                           if u not in seen and not seen.add(u)
+                           and self.conn.execute("SELECT 1 FROM offsets WHERE username=?", (u,)).fetchone() is None]
+            if not records:
+                return 0
+            with open(USERS_FILE, "r+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        # hand-edited file (or an interrupted append) without a final newline: keep
+                        # that line as it is and start the new record on a line of its own
+                        f.write(b"\n")
+                        end += 1
+                data = "".join(f"{u},{h}\n" for u, h in records).encode("utf-8")
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            _, _, lines, users = self._state()
+            lines, users = self._index_lines(end, data, lines, users)
+            self.conn.execute("UPDATE log_state SET size=?, lines=?, users=?", (end + len(data), lines, users))
+        if lines >= COMPACT_MIN_LINES and lines > COMPACT_RATIO * users:
+            self.compact()
+        return len(records)
+
+    def add(self, username, hashed) -> bool:
+        """Add a new user. Returns False if the username exists."""
+        return self._append([(username, hashed)], only_new=True) == 1
+
+    def set(self, username, hashed):
+        self._append([(username, hashed)])
+
+    def add_many(self, records) -> int:
+        """Append new users with one fsync and one index transaction. Existing usernames are skipped; returns the number added."""
+        return self._append(records, only_new=True)
+
+    def items(self):
+        return iter(list(load_users().items()))
+
+    def compact(self):
+        with self._locked():
+            write_users_atomic(load_users())
+            self._catch_up(rebuild=True)
+
+
+class SqliteUserStore:
+    """
+    users.db, table users(username PRIMARY KEY, password_hash) WITHOUT ROWID:
+    lookups and inserts are B-tree operations, each committed durably
+    (WAL + synchronous=FULL). Imports users.txt the first time it is opened.
+    """
+
+    def __init__(self, path=USERS_DB):
+        new_file = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, timeout=30)
+        if new_file:
+            try:
+                os.chmod(path, 0o600)
+            except PermissionError:
+                pass
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password_hash TEXT NOT NULL) WITHOUT ROWID"
+            )
+            empty = self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+            if empty and os.path.exists(USERS_FILE):
+                self.conn.executemany("INSERT OR IGNORE INTO users VALUES (?,?)", load_users().items())
+
+    def get(self, username):
+        row = self.conn.execute("SELECT password_hash FROM users WHERE username=?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, username, hashed) -> bool:
+        """Add a new user. Returns False if the username exists."""
+        with self.conn:
+            cur = self.conn.execute("INSERT OR IGNORE INTO users VALUES (?,?)", (username, hashed))
+        return cur.rowcount == 1
+
+    def set(self, username, hashed):
+        with self.conn:
+            self.conn.execute("UPDATE users SET password_hash=? WHERE username=?", (hashed, username))
+
+    def add_many(self, records) -> int:
+        """Add new users in one transaction. Existing usernames are skipped; returns the number added."""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO users VALUES (?,?)", records)
+            return self.conn.total_changes - before
+
+    def items(self):
+        return self.conn.execute("SELECT username, password_hash FROM users")
+
+
+USER_STORES = {"log": LogUserStore, "sqlite": SqliteUserStore}
+
+
+@functools.lru_cache(maxsize=None)
+def _user_store(backend, cwd):
+    return USER_STORES[backend]()
+
+
+def open_user_store(backend=None):
+    """
+    The configured user store (AUTH_BACKEND env var, default 'log'). One store,
+    and one index / database connection, per process and working directory
+    (the store files are relative paths); later calls reuse it.
     """
+    backend = backend or AUTH_BACKEND
+    if backend not in USER_STORES:
+        raise ValueError(f"unknown auth backend {backend!r}; choose from {sorted(USER_STORES)}")
+    return _user_store(backend, os.getcwd())
+
+
+def valid_new_user(username: str, password: str) -> bool:
+    """Username / password policy for new accounts."""
     if not username or "," in username or len(username) > 150:
         return False
     if len(password) < 8:
         # require at least 8 chars; you can raise this if you want stricter policy
         return False
+    return True
+
 
-    users = load_users()
-    if username in users:
+def register_user(username: str, password: str) -> bool:
+    """
+    Register a new user.
+    Returns True on success, False if user exists or invalid input.
+    """
+    if not valid_new_user(username, password):
         return False
 
-    hashed = hash_password(password)
-    users[username] = hashed
-    write_users_atomic(users)
-    return True
+    return open_user_store().add(username, hash_password(password))
 
 
 def login_user(username: str, password: str) -> bool:
     """Verify a login. Returns True if credentials match."""
-    users = load_users()
-    hashed = users.get(username)
+    hashed = open_user_store().get(username)
     if not hashed:
         return False
     return verify_password(password, hashed)
@@ -127,17 +370,90 @@ def change_password(username: str, old_password: str, new_password: str) -> bool
     """Change a user's password after verifying old password. Returns True on success."""
     if len(new_password) < 8:
         return False
-    users = load_users()
-    hashed = users.get(username)
+    store = open_user_store()
+    hashed = store.get(username)
     if not hashed:
         return False
     if not verify_password(old_password, hashed):
         return False
-    users[username] = hash_password(new_password)
-    write_users_atomic(users)
+    store.set(username, hash_password(new_password))
     return True
 
 
+def bulk_register(csv_path: str, workers=None) -> dict:
+    """
+    Register every username,password row of a CSV (an optional
+    "username,password" header is skipped). Passwords are hashed across a
+    process pool and all new users are committed in one atomic write /
+    transaction. Invalid, duplicate and existing usernames are skipped.
+    Returns counts and timings.
+    """
+    store = open_user_store()
+    seen = set()
+    usernames, passwords = [], []
+    skipped = 0
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i == 0 and [c.strip().lower() for c in row[:2]] == ["username", "password"]:
+                continue
+            if len(row) < 2:
+                skipped += 1
+                continue
+            username, password = row[0].strip(), row[1]
+            if not valid_new_user(username, password) or username in seen or store.get(username) is not None:
+                skipped += 1
+                continue
+            seen.add(username)
+            usernames.append(username)
+            passwords.append(password)
+
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if usernames:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(1, len(passwords) // (workers * 4))
+            hashes = list(pool.map(hash_password, passwords, chunksize=chunk))
+    else:
+        hashes = []
+    hashed_s = time.perf_counter() - t0
+    added = store.add_many(list(zip(usernames, hashes)))
+    total_s = time.perf_counter() - t0
+    return {"added": added, "skipped": skipped + len(usernames) - added, "workers": workers,
+            "hash_seconds": hashed_s, "total_seconds": total_s}
+
+
+def export_users(db_path=PLATFORM_DB) -> dict:
+    """
+    Stream users from the configured store into the users table website.py's
+    DB.login reads, in batches. Usernames already present there are left alone.
+    Returns counts.
+    """
+    counts = {"exported": 0, "already_present": 0}
+    conn = sqlite3.connect(db_path, timeout=30)
+
+    def flush(batch):
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO users (username, password_hash) VALUES (?,?)", batch)
+        inserted = conn.total_changes - before
+        counts["exported"] += inserted
+        counts["already_present"] += len(batch) - inserted
+
+    try:
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password_hash TEXT)')
+            batch = []
+            for record in open_user_store().items():
+                batch.append(tuple(record))
+                if len(batch) >= EXPORT_BATCH:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+    finally:
+        conn.close()
+    return counts
+
+
 def cli_register():
     username = input("username: ").strip()
     password = getpass.getpass("password: ")
@@ -177,10 +493,31 @@ def cli_change_password():
         print("Password change failed.")
 
 
+def cli_bulk_register(csv_path, workers):
+    if not csv_path:
+        print("bulk-register needs a CSV path: username,password per line.")
+        return
+    r = bulk_register(csv_path, workers)
+    rate = r["added"] / r["total_seconds"] if r["total_seconds"] else 0.0
+    print(f"Registered {r['added']} users ({r['skipped']} skipped) in {r['total_seconds']:.2f}s "
+          f"[hashing {r['hash_seconds']:.2f}s on {r['workers']} workers] - {rate:.1f} users/s")
+
+
+def cli_export(db_path):
+    r = export_users(db_path or PLATFORM_DB)
+    print(f"Exported {r['exported']} users to {db_path or PLATFORM_DB} ({r['already_present']} already present).")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Simple auth CLI")
-    parser.add_argument("action", choices=["register", "login", "changepw"], help="action")
+    parser.add_argument("action", choices=["register", "login", "changepw", "bulk-register", "export"], help="action")
+    parser.add_argument("path", nargs="?", help="bulk-register: CSV of username,password; export: target database")
+    parser.add_argument("--backend", choices=sorted(USER_STORES), help="user store (default: $AUTH_BACKEND or log)")
+    parser.add_argument("--workers", type=int, help="bulk-register: hashing processes (default: all cores)")
     args = parser.parse_args()
+    if args.backend:
+        global AUTH_BACKEND
+        AUTH_BACKEND = args.backend
 
     if args.action == "register":
         cli_register()
@@ -188,6 +525,10 @@ def main():
         cli_login()
     elif args.action == "changepw":
         cli_change_password()
+    elif args.action == "bulk-register":
+        cli_bulk_register(args.path, args.workers)
+    elif args.action == "export":
+        cli_export(args.path)
 
 
 if __name__ == "__main__":
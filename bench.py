@@ -0,0 +1,283 @@
+# bench.py
+"""
+Benchmarks for the platform's data paths, written to JSON for comparing runs
+- generates synthetic CSVs (datagen.py) at the requested scale, or uses an
+  existing folder, and loads them into a fresh scratch database (the real
+  intelligence_platform.db is never touched)
+- times what the dashboard does:
+    load_data      ingest.load_sources, first load and unchanged re-run (DB.load_data)
+    get            reading each decoded view and the typed frame (DB.get), cold and via TableCache,
+                   and per-staff percentiles from the sketch rollup vs. exact from the frame
+    tickets        TicketAnalytics load (CSV parse, then columnar cache) and summarize, and the
+                   partitioned engine (cold, then from its per-shard partials after a restart)
+    fetch          DatabaseManager.fetch_* (data.py)
+    auth           app.py register / login with the real bcrypt cost, serially and through KDFPool
+- each timing is the best and median of --repeat runs; results go to
+  bench_results/<timestamp>.json with the scale, git commit and machine
+    python bench.py --rows 100k
+    python bench.py --rows 1M --skip auth --compare bench_results/older.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import analytics_engine
+import datagen
+import frames
+import ingest
+import rollups
+import schema
+from db_pool import get_pool
+from search import ensure_fts
+from table_cache import TableCache
+
+RESULTS_DIR = "bench_results"
+SECTIONS = ["load_data", "get", "tickets", "fetch", "auth"]
+
+
+def timed(fn, repeat=1, setup=None):
+    """Run fn repeat times (setup() before each, untimed). Returns (stats dict, last result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": statistics.median(times), "runs": len(times)}, result
+
+
+def with_rate(stats, rows, unit="rows_per_s"):
+    stats[unit] = rows / stats["best_s"] if stats["best_s"] > 0 else 0.0
+    return stats
+
+
+def open_scratch_db(path):
+    """Fresh database with the same schema, FTS and rollups as website.init_db."""
+    pool = get_pool(path)
+    with pool.connection() as conn:
+        schema.migrate(conn)
+        for table in rollups.ROLLUPS:
+            ensure_fts(conn, table)
+            rollups.ensure_rollups(conn, table)
+    return pool
+
+
+def bench_load_data(pool, folder, repeat):
+    out = {}
+    with pool.connection() as conn:
+        results = ingest.load_sources(conn, folder)  # first load into empty tables
+        for r in results:
+            if r["error"]:
+                raise RuntimeError(f"{r['source']}: {r['error']}")
+            out[r["source"]] = {"rows": r["rows"], "seconds": r["seconds"], "rows_per_s": r["rows_per_sec"]}
+        out["unchanged_rerun"], _ = timed(lambda: ingest.load_sources(conn, folder), repeat)
+    return out
+
+
+def bench_get(pool, repeat):
+    out = {}
+    cache = TableCache()
+    for table in schema.TABLES:
+        def read():
+            with pool.connection() as conn:
+                return pd.read_sql_query(f"SELECT * FROM {schema.view(table)}", conn)
+        cold, df = timed(read, repeat)
+        cache.get(table, "*", read)
+        hit, _ = timed(lambda: cache.get(table, "*", read), max(repeat, 10))
+
+        def read_typed():
+            with pool.connection() as conn:
+                return frames.load(conn, table)
+        typed, typed_df = timed(read_typed, repeat)
+        out[table] = {
+            "rows": len(df), "cold": with_rate(cold, len(df)), "cached": hit, "typed": with_rate(typed, len(df)),
+            "bytes_view": int(df.memory_usage(deep=True).sum()), "bytes_typed": int(typed_df.memory_usage(deep=True).sum()),
+        }
+        if table in rollups.DISTRIBUTIONS:
+            _, column, (dim, _) = rollups.DISTRIBUTIONS[table]
+
+            def from_rollup():
+                with pool.connection() as conn:
+                    return rollups.percentiles(conn, table, dim)
+            out[table]["percentiles_rollup"], _ = timed(from_rollup, max(repeat, 10))
+            out[table]["percentiles_exact"], _ = timed(
+                lambda: typed_df.groupby(dim, observed=True)[column].quantile([0.5, 0.9, 0.99]), repeat)
+    return out
+
+
+def bench_tickets(folder, repeat):
+    from operatios import TicketAnalytics
+    import columnar_cache
+
+    ta = TicketAnalytics.__new__(TicketAnalytics)  # the page hard-codes its CSV path
+    ta.file_path = os.path.join(folder, "it_tickets.csv")
+    cache_dir = os.path.join(folder, columnar_cache.CACHE_DIRNAME)
+
+    cold, df = timed(ta.load_data, repeat, setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+    warm, df = timed(ta.load_data, repeat)
+    summary, _ = timed(lambda: TicketAnalytics.summarize(df), repeat)
+
+    def partitioned():
+        engine = analytics_engine.PartitionedAnalytics()
+        try:
+            return engine.summarize(ta.file_path)
+        finally:
+            engine.shutdown()
+    part_cold, _ = timed(partitioned, repeat, setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+    part_warm, _ = timed(partitioned, repeat)
+    workers = analytics_engine.PartitionedAnalytics().workers
+    return {
+        "rows": len(df),
+        "load_csv": with_rate(cold, len(df)),
+        "load_cached": with_rate(warm, len(df)),
+        "summarize": with_rate(summary, len(df)),
+        "partitioned_cold": with_rate(part_cold, len(df)) | {"workers": workers},
+        "partitioned_cached": with_rate(part_warm, len(df)),
+    }
+
+
+def bench_fetch(db_path, repeat):
+    from data import DatabaseManager
+
+    manager = DatabaseManager(db_path)
+    out = {}
+    for name in ["fetch_users", "fetch_cyber_incidents", "fetch_datasets", "fetch_it_tickets"]:
+        stats, df = timed(getattr(manager, name), repeat)
+        out[name] = with_rate(stats, len(df)) | {"rows": len(df)}
+    return out
+
+
+def bench_auth(ops, workdir):
+    """Register then log in `ops` users with app.py, in a scratch directory (users.txt is relative)."""
+    import app
+    from kdf_pool import KDFPool
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        names = [f"bench_user_{i}" for i in range(ops)]
+        register, ok = timed(lambda: all(app.register_user(n, "password123") for n in names))
+        login, ok_login = timed(lambda: all(app.login_user(n, "password123") for n in names))
+        if not (ok and ok_login):
+            raise RuntimeError("register / login failed during the benchmark")
+
+        pool = KDFPool()
+        hashes = [app.hash_password("password123") for _ in range(2)]
+        pooled, _ = timed(lambda: [f.result() for f in [
+            pool.submit(app.verify_password, "password123", hashes[i % 2]) for i in range(ops * 2)]])
+        pool.shutdown()
+    finally:
+        os.chdir(cwd)
+    return {
+        "backend": app.AUTH_BACKEND,
+        "bcrypt_rounds": app.BCRYPT_ROUNDS,
+        "register": with_rate(register, ops, "ops_per_s"),
+        "login": with_rate(login, ops, "ops_per_s"),
+        "kdf_pool_verify": with_rate(pooled, ops * 2, "ops_per_s") | {"workers": pool.workers},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from _flatten(v, f"{prefix}{k}.")
+        elif k in ("best_s", "rows_per_s", "ops_per_s") or k.startswith("bytes_"):
+            yield f"{prefix}{k}", v
+
+
+def compare(old_path, new):
+    """Print every timing / rate present in both runs with the relative change."""
+    with open(old_path) as f:
+        old_run = json.load(f)
+    if old_run.get("scale") != new["scale"]:
+        print(f"note: different scale ({old_run.get('scale')} vs {new['scale']}), compare rates rather than times")
+    old = dict(_flatten(old_run["results"]))
+    print(f"\n{'metric':60} {'old':>12} {'new':>12} {'change':>8}")
+    for key, value in _flatten(new["results"]):
+        if key in old and old[key]:
+            print(f"{key:60} {old[key]:12.4g} {value:12.4g} {(value / old[key] - 1) * 100:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the platform's data paths")
+    parser.add_argument("--rows", default="100k", help="synthetic incidents / tickets (10k .. 10M)")
+    parser.add_argument("--data", help="use the CSVs in this folder instead of generating them")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--auth-ops", type=int, default=8, help="users to register / log in (bcrypt is slow)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=SECTIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        folder = os.path.join(workdir, "DATA")
+        if args.data:
+            shutil.copytree(args.data, folder, ignore=shutil.ignore_patterns(".cache"))
+            scale = {"data": os.path.abspath(args.data)}
+        else:
+            rows = datagen.parse_count(args.rows)
+            t0 = time.perf_counter()
+            scale = datagen.generate(folder, rows, rows, max(5, rows // 1000), args.seed)
+            print(f"generated {sum(scale.values()):,} rows in {time.perf_counter() - t0:.1f}s")
+
+        db_path = os.path.join(workdir, "bench.db")
+        pool = open_scratch_db(db_path)
+        sections = [s for s in SECTIONS if s not in args.skip]
+        results = {}
+        for section in sections:
+            print(f"{section} ...", flush=True)
+            if section == "load_data":
+                results[section] = bench_load_data(pool, folder, args.repeat)
+            elif section == "get":
+                results[section] = bench_get(pool, args.repeat)
+            elif section == "tickets":
+                results[section] = bench_tickets(folder, args.repeat)
+            elif section == "fetch":
+                results[section] = bench_fetch(db_path, args.repeat)
+            elif section == "auth":
+                results[section] = bench_auth(args.auth_ops, workdir)
+        pool.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    run = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "scale": scale,
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(),
+                    "pandas": pd.__version__},
+        "results": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2, default=str)
+    print(f"results -> {path}")
+    if args.compare:
+        compare(args.compare, run)
+
+
+if __name__ == "__main__":
+    main()
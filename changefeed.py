@@ -0,0 +1,199 @@
+# changefeed.py
+"""
+Change feed for live dashboards
+- a trigger-maintained changelog records every insert / update / delete on
+  the watched tables as (seq, tbl, op, first_id, last_id); seq is
+  monotonic and, with SQLite's single writer, in commit order
+- bulk loads (ingest.py) pause the row triggers and log one 'append' or
+  'reload' entry covering the loaded id range instead of a row each
+- LiveFeed keeps running totals, per-dimension counts and the latest rows
+  for one table; poll() reads only the changelog past its high-water mark
+  and the rows those entries point at. An idle poll is one primary-key
+  lookup; updates, deletes, reloads, big appends or a gap left by pruning
+  make it resync from the indexes instead
+- one LiveFeed is shared by every session, and polls closer together than
+  MIN_POLL_S are answered from memory, so many wall displays cost the
+  same as one
+- the changelog is pruned to the last CHANGELOG_KEEP entries
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+import aggregates
+import schema
+
+WATCHED = ["cyber_incidents", "it_tickets"]
+CHANGELOG_KEEP = 10_000
+MIN_POLL_S = 0.2
+MAX_ENTRIES = 1_000      # changelog entries applied per poll
+RESYNC_ROWS = 5_000      # appends larger than this are counted from the indexes instead
+LATEST_ROWS = 10
+ARRIVAL_MINUTES = 60     # per-minute arrivals kept for the live chart
+
+
+def ensure_changelog(conn, table):
+    """Create the changelog and table's triggers if missing."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL, op TEXT NOT NULL, first_id INTEGER, last_id INTEGER
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS changelog_paused (tbl TEXT PRIMARY KEY)")
+    paused = f"NOT EXISTS (SELECT 1 FROM changelog_paused WHERE tbl = '{table}')"
+    for op, event, ref in [("insert", "INSERT", "new"), ("update", "UPDATE", "new"), ("delete", "DELETE", "old")]:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS changelog_{table}_{op} AFTER {event} ON {table}
+            WHEN {paused} BEGIN
+                INSERT INTO changelog (tbl, op, first_id, last_id) VALUES ('{table}', '{op}', {ref}.id, {ref}.id);
+            END
+        """)
+
+
+def prune(conn, keep=CHANGELOG_KEEP):
+    """Drop all but the newest keep entries. Returns rows deleted."""
+    return conn.execute("DELETE FROM changelog WHERE seq <= (SELECT MAX(seq) FROM changelog) - ?", (keep,)).rowcount
+
+
+@contextmanager
+def bulk(conn, table, full=False):
+    """
+    Pause table's changelog triggers for a bulk load inside the caller's
+    transaction and log the load as one entry ('reload' when the table was
+    emptied first, else 'append' with the new id range).
+    """
+    if table not in WATCHED or not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='changelog_paused'").fetchone():
+        yield
+        return
+    max_id = f"SELECT COALESCE(MAX(id), 0) FROM {table}"
+    before = conn.execute(max_id).fetchone()[0]
+    conn.execute("INSERT OR IGNORE INTO changelog_paused VALUES (?)", (table,))
+    yield
+    conn.execute("DELETE FROM changelog_paused WHERE tbl = ?", (table,))
+    after = conn.execute(max_id).fetchone()[0]
+    if full or after > before:
+        conn.execute("INSERT INTO changelog (tbl, op, first_id, last_id) VALUES (?, ?, ?, ?)",
+                     (table, "reload" if full else "append", before + 1, after))
+
+
+class LiveFeed:
+    def __init__(self, pool, table, dims, latest=LATEST_ROWS):
+        self.pool = pool
+        self.table = table
+        self.dims = list(dims)
+        self._lock = threading.Lock()
+        self._seq = None  # None until the first sync
+        self._total = 0
+        self._counts = {d: Counter() for d in self.dims}
+        self._latest = deque(maxlen=latest)
+        self._arrivals = deque(maxlen=ARRIVAL_MINUTES)  # [minute, rows]
+        self._last_poll = 0.0
+        self._stats = {"polls": 0, "idle_polls": 0, "rows_applied": 0, "resyncs": 0, "poll_s": 0.0}
+
+    # ---------- reading the database ----------
+    def _resync(self, conn):
+        self._total = aggregates.count(conn, self.table)
+        self._counts = {d: Counter(aggregates.count_by(conn, self.table, d).to_dict()) for d in self.dims}
+        rows = pd.read_sql_query(f"SELECT * FROM {schema.view(self.table)} ORDER BY id DESC LIMIT ?",
+                                 conn, params=[self._latest.maxlen])
+        self._latest.clear()
+        self._latest.extend(reversed(rows.to_dict("records")))
+        self._stats["resyncs"] += 1
+
+    def _apply_rows(self, conn, lo, hi):
+        rows = pd.read_sql_query(f"SELECT * FROM {schema.view(self.table)} WHERE id BETWEEN ? AND ? ORDER BY id",
+                                 conn, params=[lo, hi])
+        for row in rows.to_dict("records"):
+            self._total += 1
+            for d in self.dims:
+                if pd.notna(row[d]):
+                    self._counts[d][row[d]] += 1
+            self._latest.append(row)
+        self._stats["rows_applied"] += len(rows)
+        return len(rows)
+
+    def _arrived(self, n):
+        minute = int(time.time() // 60 * 60)
+        if self._arrivals and self._arrivals[-1][0] == minute:
+            self._arrivals[-1][1] += n
+        else:
+            self._arrivals.append([minute, n])
+
+    def poll(self) -> bool:
+        """Apply changes since the last poll. Returns True if anything changed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._seq is not None and now - self._last_poll < MIN_POLL_S:
+                return False
+            self._last_poll = now
+            self._stats["polls"] += 1
+            changed = False
+            with self.pool.connection() as conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")  # one snapshot for the changelog and the rows
+                lo_seq, hi_seq = conn.execute("SELECT MIN(seq), MAX(seq) FROM changelog").fetchone()
+                hi_seq = hi_seq or 0
+                if self._seq is None or (lo_seq is not None and lo_seq > self._seq + 1):
+                    self._resync(conn)  # first sync, or entries we needed were pruned
+                    self._seq, changed = hi_seq, True
+                elif hi_seq > self._seq:
+                    entries = conn.execute(
+                        "SELECT seq, op, first_id, last_id FROM changelog WHERE tbl = ? AND seq > ? ORDER BY seq LIMIT ?",
+                        (self.table, self._seq, MAX_ENTRIES)).fetchall()
+                    if entries:
+                        changed = True
+                        inserts = [e for e in entries if e[1] in ("insert", "append")]
+                        lo, hi = (min(e[2] for e in inserts), max(e[3] for e in inserts)) if inserts else (0, -1)
+                        if len(inserts) < len(entries) or hi - lo + 1 > RESYNC_ROWS:
+                            self._resync(conn)
+                        else:
+                            self._arrived(self._apply_rows(conn, lo, hi))
+                    self._seq = entries[-1][0] if len(entries) == MAX_ENTRIES else max(hi_seq, self._seq)
+                else:
+                    self._stats["idle_polls"] += 1
+            if hi_seq - (lo_seq or 0) > 2 * CHANGELOG_KEEP:
+                with self.pool.connection() as conn:
+                    prune(conn)
+            self._stats["poll_s"] += time.monotonic() - now
+            return changed
+
+    # ---------- reading the state ----------
+    def total(self) -> int:
+        with self._lock:
+            return self._total
+
+    def counts(self, dim) -> pd.Series:
+        """Like aggregates.count_by: value -> rows, most frequent first."""
+        with self._lock:
+            items = self._counts[dim].most_common()
+        return pd.Series(dict(items), name="count", dtype="int64").rename_axis(dim)
+
+    def matching(self, dim, pattern) -> int:
+        """Rows whose dim value contains the regex pattern (case-insensitive)."""
+        return aggregates.matching(self.counts(dim), pattern)
+
+    def latest(self) -> pd.DataFrame:
+        """The newest rows, newest first."""
+        with self._lock:
+            rows = list(self._latest)
+        return pd.DataFrame(rows[::-1]).drop(columns="id", errors="ignore")
+
+    def arrivals(self) -> pd.Series:
+        """Rows seen per minute by this feed (recent minutes only)."""
+        with self._lock:
+            data = list(self._arrivals)
+        s = pd.Series({pd.to_datetime(m, unit="s"): n for m, n in data}, name="new rows", dtype="int64")
+        return s.asfreq("min", fill_value=0) if len(s) else s
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["seq"] = self._seq
+        s["avg_poll_ms"] = 1000 * s.pop("poll_s") / s["polls"] if s["polls"] else 0.0
+        return s
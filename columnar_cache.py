@@ -0,0 +1,130 @@
+# columnar_cache.py
+"""
+Typed columnar cache for the DATA/ CSV sources
+- the first read parses the CSV once (timestamps, categorical enums,
+  numeric columns) and writes an uncompressed Feather (Arrow IPC) file
+- later reads load the Arrow columns from that file instead of re-parsing
+  text (to_pandas() still copies them into a DataFrame)
+- a cache that can't be written or read (read-only folder, a frame Arrow
+  can't encode, a truncated file) falls back to the parsed CSV
+- the cache is rebuilt when the source CSV's size or mtime changes
+Needs pyarrow; without it read_csv_cached() just parses the CSV with the same types.
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+    from pyarrow.lib import ArrowException
+except ImportError:  # optional dependency
+    feather = None
+    ArrowException = OSError
+
+CACHE_DIRNAME = ".cache"
+
+# CSV filename -> column types applied at parse time
+SCHEMAS = {
+    "it_tickets.csv": {
+        "dates": ["created_at"],
+        "categories": ["priority", "status", "assigned_to"],
+        "numeric": ["ticket_id", "resolution_time_hours"],
+    },
+    "cyber_incidents.csv": {
+        "dates": ["timestamp"],
+        "categories": ["severity", "category", "status"],
+        "numeric": ["incident_id"],
+    },
+    "datasets_metadata.csv": {
+        "dates": ["upload_date"],
+        "categories": ["uploaded_by"],
+        "numeric": ["dataset_id", "rows", "columns"],
+    },
+}
+
+
+def _cache_paths(csv_path):
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    cache_dir = os.path.join(folder, CACHE_DIRNAME)
+    base = os.path.join(cache_dir, os.path.splitext(name)[0])
+    return cache_dir, base + ".feather", base + ".meta.json"
+
+
+def _source_signature(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def parse_typed(csv_path) -> pd.DataFrame:
+    """Parse a CSV and apply its schema from SCHEMAS (if any)."""
+    df = pd.read_csv(csv_path, on_bad_lines='skip')
+    df.columns = df.columns.str.strip()
+    schema = SCHEMAS.get(os.path.basename(csv_path), {})
+    for col in schema.get("dates", []):
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in schema.get("numeric", []):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in schema.get("categories", []):
+        if col in df:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _write_atomic(df, feather_path, meta_path, signature):
+    """Write the feather file and its metadata via temp files + os.replace."""
+    cache_dir = os.path.dirname(feather_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".feather")
+    os.close(fd)
+    try:
+        # uncompressed: reading it back is a plain copy, no decompression
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, feather_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(signature, f)
+    os.replace(tmp, meta_path)
+
+
+def is_fresh(csv_path) -> bool:
+    """True if a cache file exists for csv_path and matches the source's size/mtime."""
+    _, feather_path, meta_path = _cache_paths(csv_path)
+    if feather is None or not os.path.exists(feather_path) or not os.path.exists(meta_path):
+        return False
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f) == _source_signature(csv_path)
+    except (OSError, ValueError):
+        return False
+
+
+def read_csv_cached(csv_path) -> pd.DataFrame:
+    """
+    Return the typed DataFrame for csv_path, from the columnar cache when it
+    is fresh, otherwise parsing the CSV and (re)building the cache.
+    """
+    if feather is None:
+        return parse_typed(csv_path)
+
+    _, feather_path, meta_path = _cache_paths(csv_path)
+    if is_fresh(csv_path):
+        try:
+            return feather.read_table(feather_path).to_pandas()
+        except (OSError, ArrowException):
+            pass  # damaged cache file: re-parse and rewrite it below
+
+    signature = _source_signature(csv_path)
+    df = parse_typed(csv_path)
+    try:
+        _write_atomic(df, feather_path, meta_path, signature)
+    except (OSError, ArrowException):
+        pass  # read-only folder or a frame Arrow can't encode: still return the parsed frame
+    return df
@@ -0,0 +1,91 @@
+# context_window.py
+"""
+Token-budgeted conversation window for the AI assistants
+- count_tokens() estimates tokens locally (tiktoken if installed,
+  otherwise ~4 characters per token) - no network call; tiktoken is
+  loaded on the first count, not at import
+- fit_window() keeps the newest turns that fit the budget and folds the
+  older ones into a short extractive summary, so the prompt stops growing
+  with the length of the session
+"""
+
+import re
+
+from startup import timed_import
+
+PROMPT_TOKEN_BUDGET = 3000
+SUMMARY_TOKEN_BUDGET = 400
+MESSAGE_OVERHEAD = 4  # role / separator tokens per message
+SUMMARY_LINE_CHARS = 160
+
+_encoding = []  # [encoding or None] once resolved
+
+
+def _get_encoding():
+    if not _encoding:
+        try:
+            _encoding.append(timed_import("tiktoken").get_encoding("cl100k_base"))
+        except Exception:  # optional dependency (import or encoding download can fail offline)
+            _encoding.append(None)
+    return _encoding[0]
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, (len(text) + 3) // 4)
+
+
+def _gist(text, limit=SUMMARY_LINE_CHARS):
+    """First sentence of text, cut to limit characters."""
+    text = re.sub(r"\s+", " ", text).strip()
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return first if len(first) <= limit else first[:limit - 1].rstrip() + "…"
+
+
+def summarize(turns, budget=SUMMARY_TOKEN_BUDGET):
+    """Compact summary of turns [(role, text)], newest lines kept when over budget."""
+    lines = []
+    used = count_tokens("Earlier in this conversation:")
+    for role, text in reversed(turns):
+        line = f"- {'User' if role == 'user' else 'Assistant'}: {_gist(text)}"
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return None
+    omitted = len(turns) - len(lines)
+    header = "Earlier in this conversation" + (f" ({omitted} older turns omitted)" if omitted else "") + ":"
+    return "\n".join([header] + lines[::-1])
+
+
+def fit_window(system_prompt, turns, budget=PROMPT_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+    """
+    turns: [(role, text)] oldest first, ending with the new user prompt.
+    Returns (summary or None, kept_turns, info) where info has
+    prompt_tokens, kept_turns and summarized_turns.
+    """
+    used = count_tokens(system_prompt) + MESSAGE_OVERHEAD
+    kept = []
+    for role, text in reversed(turns):
+        cost = count_tokens(text) + MESSAGE_OVERHEAD
+        if kept and used + cost > budget - summary_budget:
+            break
+        kept.append((role, text))
+        used += cost
+    kept.reverse()
+    # start the window on a user turn so the history alternates cleanly
+    while len(kept) > 1 and kept[0][0] != "user":
+        used -= count_tokens(kept[0][1]) + MESSAGE_OVERHEAD
+        kept.pop(0)
+
+    dropped = turns[:len(turns) - len(kept)]
+    summary = summarize(dropped, summary_budget) if dropped else None
+    if summary:
+        used += count_tokens(summary) + MESSAGE_OVERHEAD
+    return summary, kept, {"prompt_tokens": used, "kept_turns": len(kept), "summarized_turns": len(dropped)}
@@ -0,0 +1,191 @@
+# datagen.py
+"""
+Synthetic DATA/ CSVs at any scale for benchmarks and load tests
+- same files and columns as the shipped samples: cyber_incidents.csv,
+  it_tickets.csv, datasets_metadata.csv
+- skewed like real data: weighted severities / priorities, weekday and
+  business-hour peaks with occasional incident storms, older items mostly
+  resolved, a few staff carrying most tickets, log-normal resolution times
+  (faster for higher priority)
+- vectorized with numpy and written in chunks, so 10M rows stay in bounded memory
+    python datagen.py OUT_DIR --rows 1M [--seed 1]
+    python datagen.py OUT_DIR --incidents 10M --tickets 2M --datasets 5k
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+START, END = pd.Timestamp("2023-01-01"), pd.Timestamp("2025-12-31")
+
+SEVERITIES = (["Low", "Medium", "High", "Critical"], [0.35, 0.40, 0.18, 0.07])
+CATEGORIES = (["Phishing", "Malware", "Unauthorized Access", "DDoS", "Misconfiguration", "Data Leak"],
+              [0.34, 0.24, 0.16, 0.10, 0.10, 0.06])
+PRIORITIES = (["Low", "Medium", "High", "Critical"], [0.30, 0.40, 0.22, 0.08])
+MEDIAN_HOURS = np.array([48.0, 24.0, 12.0, 4.0])  # by priority code
+STAFF = [f"IT_Support_{c}" for c in "ABCDEFGHIJKL"]
+UPLOADERS = (["data_scientist", "cyber_admin", "it_admin"], [0.6, 0.25, 0.15])
+
+INCIDENT_TEXT = {
+    "Phishing": ["Phishing email impersonating the CEO", "Credential harvesting link reported by staff",
+                 "Spoofed invoice email with malicious attachment", "Recent Phishing Attempt"],
+    "Malware": ["Ransomware signature detected", "Trojan quarantined by endpoint protection",
+                "Suspicious PowerShell execution", "Cryptominer process found"],
+    "Unauthorized Access": ["Repeated failed logins followed by success", "Login from unusual country",
+                            "Privilege escalation attempt", "Dormant account reactivated"],
+    "DDoS": ["SYN flood against public web server", "HTTP request spike from botnet",
+             "DNS amplification traffic", "API gateway saturated"],
+    "Misconfiguration": ["Public storage bucket exposed", "Firewall rule allows any-any",
+                         "Expired TLS certificate", "Default credentials on network device"],
+    "Data Leak": ["Sensitive file shared externally", "Customer records posted on paste site",
+                  "Unencrypted backup copied to USB", "Source code pushed to public repository"],
+}
+TICKET_TEXT = ["Printer not working", "VPN keeps disconnecting", "Password reset request", "Laptop running slow",
+               "Email not syncing on mobile", "Software installation request", "Cannot access shared drive",
+               "Monitor flickering", "Account locked out", "Wi-Fi drops in meeting room", "Teams calls dropping",
+               "New starter equipment setup"]
+HOSTS = [f"{p}-{n:02d}" for p in ("srv", "wks", "db", "web", "fw", "lap") for n in range(1, 41)]
+DEPARTMENTS = ["Finance", "HR", "Sales", "Engineering", "Legal", "Marketing", "Support", "Operations"]
+TOPICS = ["Customer_Churn", "Financial_Fraud", "Server_Logs", "Image_Classification", "Network_Traffic",
+          "Sales_Forecast", "Sensor_Readings", "Support_Chats", "Clickstream", "Threat_Intel"]
+
+
+def parse_count(text) -> int:
+    """'10k' / '1.5M' / '2500' -> int."""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def _pick(rng, values_weights, n):
+    values, weights = values_weights
+    return rng.choice(len(values), size=n, p=np.asarray(weights) / np.sum(weights))
+
+
+def _day_weights(rng, storms=True):
+    days = pd.date_range(START, END, freq="D")
+    w = np.where(days.dayofweek < 5, 1.0, 0.45)
+    if storms:  # a handful of incident storms with 5-20x the usual volume
+        w[rng.choice(len(days), size=max(1, len(days) // 60), replace=False)] *= rng.uniform(5, 20)
+    return days, w / w.sum()
+
+
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 3, 5, 9, 11, 11, 10, 8, 10, 11, 10, 9, 6, 4, 3, 2, 2, 1, 1], dtype=float)
+
+
+def _timestamps(rng, days, day_p, n):
+    day = days.values[rng.choice(len(days), size=n, p=day_p)]
+    secs = rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 3600 + rng.integers(0, 3600, size=n)
+    return pd.DatetimeIndex(day) + pd.to_timedelta(secs, unit="s")
+
+
+def _closed(rng, ts, half_life_days):
+    """Older items are more likely to be resolved."""
+    age_days = (END - ts).days.to_numpy()
+    return rng.random(len(ts)) < np.minimum(0.97, 1 - np.exp(-age_days / half_life_days))  # some backlog stays open
+
+
+def incidents_chunk(rng, start_id, n, days, day_p):
+    ts = _timestamps(rng, days, day_p, n)
+    cat = _pick(rng, CATEGORIES, n)
+    closed = _closed(rng, ts, 20)
+    status = np.where(closed, np.where(rng.random(n) < 0.7, "Resolved", "Closed"),
+                      np.where(rng.random(n) < 0.6, "Open", "In Progress"))
+    names = np.array(CATEGORIES[0])
+    phrases = np.array([INCIDENT_TEXT[c] for c in CATEGORIES[0]])  # (category, variant)
+    phrase = phrases[cat, rng.integers(0, phrases.shape[1], size=n)]
+    return pd.DataFrame({
+        "incident_id": np.arange(start_id, start_id + n),
+        "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S"),
+        "severity": np.array(SEVERITIES[0])[_pick(rng, SEVERITIES, n)],
+        "category": names[cat],
+        "status": status,
+        "description": pd.Series(phrase) + " on " + pd.Series(np.array(HOSTS)[rng.integers(0, len(HOSTS), size=n)]),
+    })
+
+
+def tickets_chunk(rng, start_id, n, days, day_p):
+    ts = _timestamps(rng, days, day_p, n)
+    prio = _pick(rng, PRIORITIES, n)
+    closed = _closed(rng, ts, 10)
+    status = np.where(closed, "Resolved", np.array(["Open", "In Progress", "Waiting for User"])[
+        rng.choice(3, size=n, p=[0.5, 0.3, 0.2])])
+    staff_w = 1 / np.arange(1, len(STAFF) + 1) ** 1.1  # Zipf-like: a few people carry most tickets
+    hours = rng.lognormal(np.log(MEDIAN_HOURS[prio]), 0.8)
+    return pd.DataFrame({
+        "ticket_id": np.arange(start_id, start_id + n),
+        "priority": np.array(PRIORITIES[0])[prio],
+        "description": pd.Series(np.array(TICKET_TEXT)[rng.integers(0, len(TICKET_TEXT), size=n)]) + " - "
+                       + pd.Series(np.array(DEPARTMENTS)[rng.integers(0, len(DEPARTMENTS), size=n)]),
+        "status": status,
+        "assigned_to": np.array(STAFF)[rng.choice(len(STAFF), size=n, p=staff_w / staff_w.sum())],
+        "created_at": ts.strftime("%Y-%m-%d %H:%M:%S"),
+        "resolution_time_hours": np.maximum(1, hours.round()).astype(int),
+    })
+
+
+def datasets_chunk(rng, start_id, n, days, day_p):
+    ids = np.arange(start_id, start_id + n)
+    return pd.DataFrame({
+        "dataset_id": ids,
+        "name": pd.Series(np.array(TOPICS)[rng.integers(0, len(TOPICS), size=n)]) + "_" + pd.Series(ids).astype(str),
+        "rows": np.clip(rng.lognormal(np.log(50_000), 2.0, size=n), 100, 50_000_000).astype(int),
+        "columns": rng.integers(5, 200, size=n),
+        "uploaded_by": np.array(UPLOADERS[0])[_pick(rng, UPLOADERS, n)],
+        "upload_date": _timestamps(rng, days, day_p, n).strftime("%Y-%m-%d"),
+    })
+
+
+# file -> (chunk builder, first id, storm days)
+FILES = {
+    "cyber_incidents.csv": (incidents_chunk, 1000, True),
+    "it_tickets.csv": (tickets_chunk, 2000, False),
+    "datasets_metadata.csv": (datasets_chunk, 1, False),
+}
+
+
+def write_csv(path, builder, first_id, rows, rng, storms):
+    days, day_p = _day_weights(rng, storms)
+    tmp = path + ".tmp"
+    for i, start in enumerate(range(0, rows, CHUNK_ROWS)):
+        n = min(CHUNK_ROWS, rows - start)
+        builder(rng, first_id + start, n, days, day_p).to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp, path)
+
+
+def generate(folder, incidents, tickets, datasets, seed=0) -> dict:
+    """Write the three CSVs into folder. Returns {filename: rows}."""
+    os.makedirs(folder, exist_ok=True)
+    counts = {"cyber_incidents.csv": incidents, "it_tickets.csv": tickets, "datasets_metadata.csv": datasets}
+    for name, (builder, first_id, storms) in FILES.items():
+        write_csv(os.path.join(folder, name), builder, first_id, counts[name],
+                  np.random.default_rng([seed, first_id]), storms)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic platform CSVs")
+    parser.add_argument("folder")
+    parser.add_argument("--rows", default="10k", help="incidents and tickets each (e.g. 10k, 1M, 10M)")
+    parser.add_argument("--incidents")
+    parser.add_argument("--tickets")
+    parser.add_argument("--datasets", help="default: rows / 1000, at least 5")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = parse_count(args.rows)
+    counts = generate(
+        args.folder,
+        parse_count(args.incidents or rows),
+        parse_count(args.tickets or rows),
+        parse_count(args.datasets or max(5, rows // 1000)),
+        args.seed,
+    )
+    for name, n in counts.items():
+        print(f"{name}: {n:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# db_pool.py
+"""
+Shared SQLite connection pool
+- connections are opened once, configured once (WAL, synchronous=NORMAL,
+  mmap_size, cache_size) and then reused across calls and threads
+- a thread re-entering pool.connection() gets the connection it already holds
+- bounded: at most max_connections are open, extra callers wait
+- stats() reports open / idle / in-use connections, waits and checkout latency
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_CONNECTIONS = 16
+BUSY_TIMEOUT = 30            # seconds, same as the old sqlite3.connect(timeout=30)
+MMAP_SIZE = 256 * 1024 ** 2  # 256 MiB memory-mapped I/O
+CACHE_SIZE_KIB = 64 * 1024   # 64 MiB page cache per connection
+
+
+class ConnectionPool:
+    def __init__(self, db_path, max_connections=MAX_CONNECTIONS, timeout=BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = []  # LIFO so the most recently used (warmest) connection is reused first
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {"checkouts": 0, "reentrant": 0, "waits": 0, "wait_s": 0.0, "checkout_s": 0.0, "max_checkout_s": 0.0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _checkout(self):
+        t0 = time.perf_counter()
+        waited = False
+        with self._cond:
+            while not self._idle and self._open >= self.max_connections:
+                waited = True
+                if not self._cond.wait(timeout=self.timeout):
+                    raise TimeoutError(f"no free connection to {self.db_path} after {self.timeout}s")
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self._open += 1  # reserve the slot before connecting outside the lock
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        elapsed = time.perf_counter() - t0
+        with self._cond:
+            s = self._stats
+            s["checkouts"] += 1
+            s["checkout_s"] += elapsed
+            s["max_checkout_s"] = max(s["max_checkout_s"], elapsed)
+            if waited:
+                s["waits"] += 1
+                s["wait_s"] += elapsed
+        return conn
+
+    def _release(self, conn):
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the current thread.
+        Commits when the outermost block exits cleanly, rolls back on error
+        (same contract as `with sqlite3.connect(...) as conn`).
+        """
+        local = self._local
+        held = getattr(local, "conn", None)
+        if held is not None:
+            with self._cond:
+                self._stats["reentrant"] += 1
+            yield held
+            return
+
+        conn = self._checkout()
+        local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            local.conn = None
+            self._release(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool counters."""
+        with self._cond:
+            s = dict(self._stats)
+            idle = len(self._idle)
+            s.update(
+                open=self._open,
+                idle=idle,
+                in_use=self._open - idle,
+                max_connections=self.max_connections,
+                avg_checkout_ms=1000 * s["checkout_s"] / s["checkouts"] if s["checkouts"] else 0.0,
+                max_checkout_ms=1000 * s.pop("max_checkout_s"),
+                wait_ms=1000 * s.pop("wait_s"),
+            )
+            s.pop("checkout_s")
+        return s
+
+    def close_all(self):
+        """Close idle connections (in-use ones are closed when returned and the pool is dropped)."""
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path) -> ConnectionPool:
+    """Process-wide pool per database file."""
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path)
+        return _pools[db_path]
@@ -0,0 +1,380 @@
+# dispatcher.py
+"""
+Shared asyncio dispatcher for AI provider requests
+- an event loop on a background thread runs every request; Streamlit
+  threads just wait on (or iterate) the result
+- per provider: token-bucket rate limits, bounded concurrency, retries
+  with exponential backoff + full jitter, and a circuit breaker that
+  counts only provider-side failures (429 / 5xx / timeouts) and lets one
+  probe request through while half-open
+- a request that fails for good raises ProviderFailed (the provider's
+  error is its __cause__)
+- identical in-flight requests (same key) share one upstream call; for
+  streams, every subscriber receives the same chunks from the start and
+  waits at most the leader's timeout for each next chunk
+- stats(): queue depth, in-flight, retries, dedup hits, p50/p95 latency
+MockProvider simulates latency and 429s for offline testing:
+    python dispatcher.py
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+MAX_RETRIES = 4
+BACKOFF_BASE_S = 0.5
+BACKOFF_CAP_S = 8.0
+MAX_QUEUE_WAIT_S = 30.0   # give up instead of holding a page for longer than this
+LATENCY_WINDOW = 1000     # requests kept for percentiles
+STREAM_TIMEOUT_S = 60.0   # longest wait for a stream's next chunk
+
+# provider -> limits. rate_limits: [(tokens per second, burst)]
+PROVIDERS = {
+    "openai": {"rate_limits": [(5.0, 10)], "concurrency": 8, "failure_threshold": 5, "reset_after_s": 30.0},
+    # Gemini free tier: 15 requests/minute and ~1000 requests/day
+    "gemini": {"rate_limits": [(15 / 60, 15), (1000 / 86400, 1000)], "concurrency": 4,
+               "failure_threshold": 5, "reset_after_s": 60.0},
+}
+DEFAULT_PROVIDER = {"rate_limits": [(5.0, 10)], "concurrency": 4, "failure_threshold": 5, "reset_after_s": 30.0}
+
+
+class RateLimited(RuntimeError):
+    """The provider's rate limit would delay the request longer than MAX_QUEUE_WAIT_S."""
+
+
+class CircuitOpen(RuntimeError):
+    """The provider has been failing; requests are rejected until the breaker half-opens."""
+
+
+class ProviderFailed(RuntimeError):
+    """The request failed with a non-retryable error, or still failed after MAX_RETRIES retries."""
+
+
+def is_retryable(exc) -> bool:
+    """429 / 5xx / timeouts / connection errors are worth retrying."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    name = type(exc).__name__
+    return any(s in name for s in ("RateLimit", "Timeout", "Connection", "Unavailable", "ResourceExhausted", "InternalServer"))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token (possibly going negative) and return how long to wait for it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_after_s):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.failures = 0
+        self.opened_at = None
+        self.probe_since = None  # half-open: when the single probe request was let through
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_after_s else "open"
+
+    def check(self) -> bool:
+        """
+        Raise CircuitOpen unless a request may go ahead. Half-open admits one
+        probe until it is recorded or released (or reset_after_s passes);
+        returns True for that probe.
+        """
+        state = self.state
+        if state == "open":
+            raise CircuitOpen("provider is failing; try again shortly")
+        if state == "half-open":
+            now = time.monotonic()
+            if self.probe_since is not None and now - self.probe_since < self.reset_after_s:
+                raise CircuitOpen("provider is failing; a probe request is in flight")
+            self.probe_since = now
+            return True
+        return False
+
+    def release(self, probe):
+        """The request ended without telling anything about the provider's health."""
+        if probe:
+            self.probe_since = None
+
+    def record(self, ok):
+        self.probe_since = None
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+        else:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.state == "half-open":
+                self.opened_at = time.monotonic()
+
+
+class _Provider:
+    def __init__(self, name, cfg):
+        self.name = name
+        self.buckets = [TokenBucket(r, b) for r, b in cfg["rate_limits"]]
+        self.concurrency = cfg["concurrency"]
+        self.semaphore = None  # created on the loop
+        self.breaker = CircuitBreaker(cfg["failure_threshold"], cfg["reset_after_s"])
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"submitted": 0, "queued": 0, "in_flight": 0, "completed": 0, "failed": 0,
+                       "retries": 0, "deduplicated": 0, "rejected": 0}
+
+
+class _Broadcast:
+    """Chunks of one upstream stream, replayable by any number of subscribers."""
+
+    def __init__(self, name, timeout):
+        self.name = name
+        self.timeout = timeout  # the leader's; followers wait no longer than it would
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def push(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self):
+        i = 0
+        while True:
+            with self.cond:
+                if not self.cond.wait_for(lambda: i < len(self.chunks) or self.done, timeout=self.timeout):
+                    raise ProviderFailed(f"{self.name}: no stream data for {self.timeout:.0f}s")
+                if i < len(self.chunks):
+                    chunk = self.chunks[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield chunk
+
+
+class Dispatcher:
+    def __init__(self, providers=None):
+        self._cfg = dict(PROVIDERS, **(providers or {}))
+        self._providers = {}
+        self._inflight = {}  # (provider, key) -> Future or _Broadcast
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ai-dispatcher", daemon=True)
+        self._thread.start()
+
+    def _provider(self, name):
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = _Provider(name, self._cfg.get(name, DEFAULT_PROVIDER))
+            return self._providers[name]
+
+    # ---------- running on the loop ----------
+    async def _admit(self, p):
+        """Wait for rate-limit tokens and a concurrency slot."""
+        wait = max(b.reserve() for b in p.buckets)
+        if wait > MAX_QUEUE_WAIT_S:
+            for b in p.buckets:
+                b.refund()
+            raise RateLimited(f"{p.name} rate limit: next slot in {wait:.0f}s")
+        if p.semaphore is None:
+            p.semaphore = asyncio.Semaphore(p.concurrency)
+        await asyncio.sleep(wait)
+        await p.semaphore.acquire()
+
+    async def _attempts(self, p, opener):
+        """Run opener() in a worker thread with admission, breaker and retries. Caller releases the semaphore."""
+        attempt = 0
+        while True:
+            probe = False
+            try:
+                probe = p.breaker.check()
+                await self._admit(p)
+            except (CircuitOpen, RateLimited):
+                p.breaker.release(probe)
+                p.counts["rejected"] += 1
+                raise
+            try:
+                result = await asyncio.to_thread(opener)
+                return result
+            except Exception as e:
+                p.semaphore.release()
+                if not is_retryable(e):
+                    # the provider answered (bad request, auth, ...): not a sign that it is down
+                    p.breaker.release(probe)
+                    raise ProviderFailed(f"{p.name}: {type(e).__name__}: {e}") from e
+                p.breaker.record(False)
+                if attempt >= MAX_RETRIES:
+                    raise ProviderFailed(f"{p.name}: {type(e).__name__}: {e} (after {attempt} retries)") from e
+                attempt += 1
+                p.counts["retries"] += 1
+                await asyncio.sleep(random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt)))
+
+    async def _run_call(self, p, fn, args):
+        started = time.perf_counter()
+        p.counts["queued"] -= 1
+        p.counts["in_flight"] += 1
+        try:
+            result = await self._attempts(p, lambda: fn(*args))
+            p.semaphore.release()
+            p.breaker.record(True)
+            p.counts["completed"] += 1
+            return result
+        except Exception:
+            p.counts["failed"] += 1
+            raise
+        finally:
+            p.counts["in_flight"] -= 1
+            p.latencies.append(time.perf_counter() - started)
+
+    async def _run_stream(self, p, opener, broadcast):
+        started = time.perf_counter()
+        p.counts["queued"] -= 1
+        p.counts["in_flight"] += 1
+        try:
+            upstream = await self._attempts(p, opener)
+        except Exception as e:
+            p.counts["failed"] += 1
+            p.counts["in_flight"] -= 1
+            broadcast.finish(e)
+            return
+
+        def pump():
+            for chunk in upstream:
+                broadcast.push(chunk)
+
+        try:
+            await asyncio.to_thread(pump)
+            p.breaker.record(True)
+            p.counts["completed"] += 1
+            broadcast.finish()
+        except Exception as e:
+            p.breaker.record(False)
+            p.counts["failed"] += 1
+            failed = ProviderFailed(f"{p.name}: stream broke: {type(e).__name__}: {e}")
+            failed.__cause__ = e
+            broadcast.finish(failed)
+        finally:
+            p.semaphore.release()
+            p.counts["in_flight"] -= 1
+            p.latencies.append(time.perf_counter() - started)
+
+    # ---------- called from Streamlit threads ----------
+    def submit(self, provider, fn, *args, key=None) -> Future:
+        """Schedule fn(*args) for provider. Calls with the same key share one in-flight request."""
+        p = self._provider(provider)
+        with self._lock:
+            if key is not None and (provider, key) in self._inflight:
+                p.counts["deduplicated"] += 1
+                return self._inflight[(provider, key)]
+            p.counts["submitted"] += 1
+            p.counts["queued"] += 1
+            fut = asyncio.run_coroutine_threadsafe(self._run_call(p, fn, args), self._loop)
+            if key is not None:
+                self._inflight[(provider, key)] = fut
+                fut.add_done_callback(lambda _: self._forget(provider, key, fut))
+        return fut
+
+    def call(self, provider, fn, *args, key=None, timeout=None):
+        """Blocking submit()."""
+        return self.submit(provider, fn, *args, key=key).result(timeout=timeout)
+
+    def stream(self, provider, opener, key=None, timeout=STREAM_TIMEOUT_S):
+        """
+        Iterate the chunks of opener()'s stream, opened through the provider's
+        limits. A concurrent request with the same key replays the same chunks.
+        Waiting longer than timeout for the next chunk raises ProviderFailed;
+        a request joining an in-flight stream keeps that stream's timeout.
+        """
+        p = self._provider(provider)
+        with self._lock:
+            broadcast = self._inflight.get((provider, key)) if key is not None else None
+            if isinstance(broadcast, _Broadcast):
+                p.counts["deduplicated"] += 1
+            else:
+                broadcast = _Broadcast(provider, timeout)
+                p.counts["submitted"] += 1
+                p.counts["queued"] += 1
+                fut = asyncio.run_coroutine_threadsafe(self._run_stream(p, opener, broadcast), self._loop)
+                if key is not None:
+                    self._inflight[(provider, key)] = broadcast
+                    fut.add_done_callback(lambda _: self._forget(provider, key, broadcast))
+        return broadcast.subscribe()
+
+    def _forget(self, provider, key, entry):
+        with self._lock:
+            if self._inflight.get((provider, key)) is entry:
+                del self._inflight[(provider, key)]
+
+    def stats(self) -> dict:
+        out = {}
+        with self._lock:
+            providers = list(self._providers.values())
+        for p in providers:
+            lat = sorted(p.latencies)
+            pct = (lambda q: 1000 * lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0)
+            out[p.name] = dict(p.counts, circuit=p.breaker.state, p50_ms=pct(0.50), p95_ms=pct(0.95))
+        return out
+
+
+class MockRateLimitError(Exception):
+    status_code = 429
+
+
+class MockProvider:
+    """Local stand-in for a model API: fixed latency, a share of calls fail with 429."""
+
+    def __init__(self, latency_s=0.05, failure_rate=0.2, seed=None):
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def __call__(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        if self._rng.random() < self.failure_rate:
+            raise MockRateLimitError("429 Too Many Requests")
+        return f"answer to {prompt}"
+
+    def stream(self, prompt):
+        self(prompt)  # may fail before any chunk, like a real API
+        return iter(f"answer to {prompt}".split())
+
+
+if __name__ == "__main__":
+    mock = MockProvider(failure_rate=0.3, seed=1)
+    d = Dispatcher({"mock": {"rate_limits": [(50.0, 20)], "concurrency": 8,
+                             "failure_threshold": 10, "reset_after_s": 5.0}})
+    futures = [d.submit("mock", mock, f"q{i % 40}", key=f"q{i % 40}") for i in range(100)]
+    ok = sum(1 for f in futures if not f.exception(timeout=60))
+    print(f"{ok}/100 succeeded, {mock.calls} upstream calls")
+    print(" ".join(d.stream("mock", lambda: mock.stream("hello"))))
+    print(d.stats())
@@ -0,0 +1,106 @@
+# frames.py
+"""
+Compact typed DataFrames for whole tables (DB.get)
+- reads the stored table, not the decoding view: enum codes become
+  pandas Categoricals directly (Categorical.from_codes), so a label string
+  is never created per row; severity and priority are ordered categories
+- epoch timestamps become datetime64, integer columns are downcast (nullable
+  Int* where values are missing), free text is Arrow-backed when pyarrow
+  is installed; an INTEGER column holding non-numeric ids stays text
+- rows are read in chunks inside one read transaction, so only a chunk of
+  Python objects exists at a time
+- memory_report() compares a sample read through the view with the same
+  rows typed, per column, scaled to the table size
+The result is meant to be shared (TableCache): treat it as read-only.
+"""
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+try:
+    import pyarrow  # noqa: F401  (optional: Arrow-backed strings)
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = object
+
+CHUNK_ROWS = 200_000
+SAMPLE_ROWS = 100_000
+
+
+def _categories(conn, enum):
+    """(lookup array code -> position, category names) for an enum table."""
+    labels = schema.labels(conn, enum)
+    codes = sorted(labels)
+    lut = np.full((codes[-1] if codes else 0) + 2, -1, dtype=np.int32)  # last slot: missing
+    lut[codes] = np.arange(len(codes))
+    return lut, [labels[c] for c in codes]
+
+
+def _typed_chunk(chunk, table, enums):
+    for col in chunk.columns:
+        k = schema.kind(table, col)
+        if k in enums:
+            lut, names = enums[k]
+            raw = pd.to_numeric(chunk[col], errors="coerce").fillna(len(lut) - 1).astype(np.int64)
+            raw = raw.where((raw >= 0) & (raw < len(lut)), len(lut) - 1)
+            chunk[col] = pd.Categorical.from_codes(lut[raw.to_numpy()], names, ordered=k in schema.ORDERED_ENUMS)
+        elif k in ("datetime", "date"):
+            chunk[col] = pd.to_datetime(chunk[col], unit="s")
+    return chunk
+
+
+def _compact(df, table):
+    """Downcast integers, and store text as TEXT_DTYPE, once the chunks are joined."""
+    for col in df.columns:
+        k = "INTEGER" if col == "id" else schema.kind(table, col)
+        if k == "INTEGER":
+            numbers = pd.to_numeric(df[col], errors="coerce")
+            if numbers.isna().sum() > df[col].isna().sum():  # non-numeric ids: keep as text
+                df[col] = df[col].astype(str).where(df[col].notna()).astype(TEXT_DTYPE)
+            elif numbers.isna().any():
+                df[col] = pd.to_numeric(numbers.astype("Int64"), downcast="integer")
+            else:
+                df[col] = pd.to_numeric(numbers.astype(np.int64), downcast="integer")
+        elif k == "TEXT":
+            df[col] = df[col].astype(TEXT_DTYPE)
+    return df
+
+
+def load(conn, table, limit=None) -> pd.DataFrame:
+    """Every row of table (or the first limit rows by id) as a compact typed frame."""
+    cols = ["id"] + [c for c, _ in schema.TABLES[table]]
+    sql = f"SELECT {', '.join(cols)} FROM {table} ORDER BY id" + (f" LIMIT {int(limit)}" if limit else "")
+    began = not conn.in_transaction
+    if began:
+        conn.execute("BEGIN")  # labels and rows from one snapshot
+    try:
+        enums = {k: _categories(conn, k) for _, k in schema.TABLES[table] if k in schema.ENUMS}
+        chunks = [_typed_chunk(chunk, table, enums)
+                  for chunk in pd.read_sql_query(sql, conn, chunksize=CHUNK_ROWS)]
+    finally:
+        if began:
+            conn.commit()
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=cols)
+    return _compact(df, table)
+
+
+def memory_report(conn, table, sample=SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Bytes per column as read through the view vs. typed, estimated for the
+    whole table from its first `sample` rows, with a 'total' row.
+    """
+    before = pd.read_sql_query(f"SELECT * FROM {schema.view(table)} ORDER BY id LIMIT ?", conn, params=[sample])
+    after = load(conn, table, limit=sample)
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    scale = rows / len(before) if len(before) else 0
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_before": (before.memory_usage(index=False, deep=True) * scale).round().astype("int64"),
+        "bytes_after": (after.memory_usage(index=False, deep=True) * scale).round().astype("int64"),
+    })
+    report.loc["total"] = ["", "", report["bytes_before"].sum(), report["bytes_after"].sum()]
+    report["saved_pct"] = (100 * (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0))).round(1)
+    return report
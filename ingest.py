@@ -0,0 +1,203 @@
+# ingest.py
+"""
+Bulk CSV ingestion for intelligence_platform.db
+- streams each CSV in chunks, encodes them for the typed schema
+  (schema.insert) and batch-inserts with executemany
+- the whole load runs inside one transaction (one savepoint per file)
+- a manifest tracks size / mtime / sha256 per source so unchanged files
+  are skipped and appended tails are loaded without wiping the table
+"""
+
+import hashlib
+import io
+import os
+import time
+
+import pandas as pd
+
+import changefeed
+import rollups
+import schema
+
+CHUNK_ROWS = 50_000
+HASH_BLOCK = 1 << 20  # 1 MiB reads when hashing / scanning
+
+# filename -> (table, columns in CSV order)
+SOURCES = {
+    "cyber_incidents.csv": (
+        "cyber_incidents",
+        ['incident_id', 'timestamp', 'severity', 'category', 'status', 'description']
+    ),
+    "datasets_metadata.csv": (
+        "datasets",
+        ['dataset_id', 'name', 'rows', 'columns', 'uploaded_by', 'upload_date']
+    ),
+    "it_tickets.csv": (
+        "it_tickets",
+        ['ticket_id', 'priority', 'description', 'status', 'assigned_to', 'created_at', 'resolution_time_hours']
+    ),
+}
+
+
+def ensure_manifest(conn):
+    """Create the ingest manifest table if needed."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            source TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            offset INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            loaded_at TEXT NOT NULL
+        )
+    ''')
+
+
+class _Slice(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file, so a half-written last line is never parsed."""
+
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self._f = f
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        b[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _complete_end(path, size):
+    """Return the offset just past the last newline (bytes after it are an unfinished row)."""
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            start = max(0, pos - HASH_BLOCK)
+            f.seek(start)
+            block = f.read(pos - start)
+            i = block.rfind(b"\n")
+            if i != -1:
+                return start + i + 1
+            pos = start
+    return 0
+
+
+def _hash_range(h, path, start, end):
+    """Feed bytes [start, end) of path into hasher h."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h
+
+
+def _read_header(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [c.strip() for c in f.readline().rstrip("\r\n").split(",")]
+
+
+def _insert_chunks(conn, path, table, cols, start, end, header):
+    """Stream [start, end) of the CSV into table. Returns rows inserted."""
+    total = 0
+    with open(path, "rb") as f:
+        reader = io.BufferedReader(_Slice(f, start, end), buffer_size=HASH_BLOCK)
+        chunks = pd.read_csv(
+            reader, sep=',', on_bad_lines='skip', dtype=str, chunksize=CHUNK_ROWS,
+            header=0 if start == 0 else None,
+            names=None if start == 0 else header,
+        )
+        for chunk in chunks:
+            chunk.columns = chunk.columns.str.strip()
+            chunk = chunk.reindex(columns=cols, fill_value="")
+            total += schema.insert(conn, table, chunk)  # enum codes / epoch timestamps
+    return total
+
+
+def _plan(conn, path, source):
+    """
+    Decide how to load a source.
+    Returns (mode, start, end, hasher) where mode is 'skipped', 'append' or 'full'.
+    """
+    stat = os.stat(path)
+    row = conn.execute(
+        "SELECT size, mtime, offset, sha256 FROM ingest_manifest WHERE source=?", (source,)
+    ).fetchone()
+    if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+        return "skipped", row[2], row[2], None
+
+    end = _complete_end(path, stat.st_size)
+    if row and end >= row[2]:
+        h = _hash_range(hashlib.sha256(), path, 0, row[2])
+        if h.hexdigest() == row[3]:
+            # same prefix: either only touched, or rows appended
+            return ("skipped" if end == row[2] else "append"), row[2], end, h
+    return "full", 0, end, hashlib.sha256()
+
+
+def load_source(conn, folder, source):
+    """
+    Load one CSV into its table, incrementally where possible.
+    Must be called inside an open transaction.
+    Returns a result dict: source, mode, rows, seconds, rows_per_sec, error.
+    """
+    table, cols = SOURCES[source]
+    path = os.path.join(folder, source)
+    result = {"source": source, "mode": "skipped", "rows": 0, "seconds": 0.0, "rows_per_sec": 0.0, "error": None}
+    t0 = time.perf_counter()
+
+    conn.execute("SAVEPOINT ingest_source")
+    try:
+        mode, start, end, h = _plan(conn, path, source)
+        rows = 0
+        if mode != "skipped":
+            with rollups.bulk(conn, table, full=mode == "full"), changefeed.bulk(conn, table, full=mode == "full"):
+                if mode == "full":
+                    conn.execute(f"DELETE FROM {table}")
+                rows = _insert_chunks(conn, path, table, cols, start, end, _read_header(path))
+            _hash_range(h, path, start, end)
+        if h is not None:
+            stat = os.stat(path)
+            prev = conn.execute("SELECT rows FROM ingest_manifest WHERE source=?", (source,)).fetchone()
+            total_rows = rows + (prev[0] if prev and mode != "full" else 0)
+            conn.execute(
+                "INSERT OR REPLACE INTO ingest_manifest VALUES (?,?,?,?,?,?,?,datetime('now'))",
+                (source, table, stat.st_size, stat.st_mtime, end, h.hexdigest(), total_rows)
+            )
+        conn.execute("RELEASE ingest_source")
+    except Exception as e:
+        conn.execute("ROLLBACK TO ingest_source")
+        conn.execute("RELEASE ingest_source")
+        result["error"] = str(e)
+        return result
+
+    elapsed = time.perf_counter() - t0
+    result.update(mode=mode, rows=rows, seconds=elapsed, rows_per_sec=rows / elapsed if elapsed > 0 else 0.0)
+    return result
+
+
+def load_sources(conn, folder, sources=None):
+    """Load every source (default: all of SOURCES) in one transaction. Returns a list of result dicts."""
+    ensure_manifest(conn)
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        results = [load_source(conn, folder, s) for s in (sources or SOURCES)]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
@@ -0,0 +1,112 @@
+# kdf_pool.py
+"""
+Bounded worker pool for bcrypt hashing / verification
+- bcrypt releases the GIL while it works, so a thread pool spreads KDF
+  calls across cores without pickling anything
+- at most `workers` hashes run at once; at most `max_pending` may be
+  queued or running, further requests fail fast with KDFBusy instead of
+  piling up behind a login burst; a caller that waits longer than
+  RESULT_TIMEOUT for its result gets KDFBusy too
+- stats() reports queue depth, rejections, queue wait and run time
+The hashing itself is app.py's hash_password / verify_password (same cost factor),
+imported on first use so pages that never hash don't load bcrypt.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from startup import lazy_module
+
+auth = lazy_module("app")
+
+MAX_PENDING = 64
+RESULT_TIMEOUT = 30  # seconds a caller waits for its hash
+
+
+class KDFBusy(RuntimeError):
+    """Raised when the pool already has max_pending requests queued or running, or a result takes too long."""
+
+
+class KDFPool:
+    def __init__(self, workers=None, max_pending=MAX_PENDING):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kdf")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "timed_out": 0, "cancelled": 0, "running": 0,
+                       "wait_s": 0.0, "max_wait_s": 0.0, "run_s": 0.0}
+
+    def _run(self, fn, args, queued_at):
+        started = time.perf_counter()
+        with self._lock:
+            waited = started - queued_at
+            self._stats["running"] += 1
+            self._stats["wait_s"] += waited
+            self._stats["max_wait_s"] = max(self._stats["max_wait_s"], waited)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["completed"] += 1
+                self._stats["run_s"] += time.perf_counter() - started
+            self._slots.release()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) on the pool and return its Future. Raises KDFBusy when saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise KDFBusy(f"{self.max_pending} password operations already pending")
+        with self._lock:
+            self._stats["submitted"] += 1
+        future = self._executor.submit(self._run, fn, args, time.perf_counter())
+        future.add_done_callback(self._on_cancel)
+        return future
+
+    def _on_cancel(self, future):
+        # a cancelled future never reaches _run, so its slot is released here
+        if future.cancelled():
+            with self._lock:
+                self._stats["cancelled"] += 1
+            self._slots.release()
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=RESULT_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()  # still queued: drop it; already running: it finishes unobserved
+            with self._lock:
+                self._stats["timed_out"] += 1
+            raise KDFBusy(f"password operation still pending after {RESULT_TIMEOUT}s") from None
+
+    def hash(self, password: str) -> str:
+        return self._result(self.submit(auth.hash_password, password))
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._result(self.submit(auth.verify_password, password, hashed))
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        done = s["completed"]
+        pending = s["submitted"] - done - s["cancelled"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "submitted": s["submitted"],
+            "completed": done,
+            "rejected": s["rejected"],
+            "timed_out": s["timed_out"],
+            "running": s["running"],
+            "queued": pending - s["running"],
+            "avg_wait_ms": 1000 * s["wait_s"] / (done + s["running"]) if done + s["running"] else 0.0,
+            "max_wait_ms": 1000 * s["max_wait_s"],
+            "avg_run_ms": 1000 * s["run_s"] / done if done else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+# llm_stream.py
+"""
+Streaming chat completions for the AI Assistant page
+- stream_chat() yields text deltas as they arrive and records
+  time-to-first-token, total latency and tokens/sec per request
+- with a dispatcher, the request goes through its rate limits, retries
+  and circuit breaker, and identical in-flight requests share one stream
+- FakeChatClient mimics client.chat.completions.create(stream=True) so the
+  page and the pipeline can be run and benchmarked offline
+    python llm_stream.py [requests]
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+
+
+def stream_chat(client, model, messages, stats, dispatcher=None, key=None):
+    """
+    Yield text deltas from a streaming chat completion.
+    stats (a dict) is filled in as the stream progresses:
+    ttft_ms, total_ms, tokens, tokens_per_s.
+    dispatcher / key: optional dispatcher.Dispatcher to send the request through.
+    """
+    t0 = time.perf_counter()
+    first = None
+    chunks = 0
+    usage_tokens = None
+    def open_stream():
+        return client.chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}
+        )
+
+    stream = dispatcher.stream("openai", open_stream, key=key) if dispatcher else open_stream()
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage_tokens = chunk.usage.completion_tokens
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if first is None:
+                first = time.perf_counter()
+                stats["ttft_ms"] = 1000 * (first - t0)
+            chunks += 1
+            yield delta
+
+    end = time.perf_counter()
+    # the API streams roughly one token per chunk; prefer its own count when sent
+    tokens = usage_tokens if usage_tokens is not None else chunks
+    gen_s = end - first if first is not None else 0.0
+    stats.update(
+        total_ms=1000 * (end - t0),
+        tokens=tokens,
+        tokens_per_s=tokens / gen_s if gen_s > 0 else 0.0,
+    )
+    stats.setdefault("ttft_ms", stats["total_ms"])
+
+
+class FakeChatClient:
+    """
+    Offline stand-in for openai.OpenAI: client.chat.completions.create(...)
+    streams a canned reply word by word after a fixed first-token delay.
+    """
+
+    def __init__(self, ttft_s=0.3, tokens_per_s=40.0, reply=None):
+        self.ttft_s = ttft_s
+        self.tokens_per_s = tokens_per_s
+        self.reply = reply
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        prompt = messages[-1]["content"] if messages else ""
+        text = self.reply or f"[offline {model}] You asked: {prompt}. Here is a placeholder answer for testing."
+        words = [w + " " for w in text.split()]
+        if not stream:
+            time.sleep(self.ttft_s + len(words) / self.tokens_per_s)
+            message = SimpleNamespace(content="".join(words).rstrip())
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self._stream(words, kwargs.get("stream_options") or {})
+
+    def _stream(self, words, stream_options):
+        time.sleep(self.ttft_s)
+        for w in words:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=w))], usage=None)
+            time.sleep(1 / self.tokens_per_s)
+        if stream_options.get("include_usage"):
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(completion_tokens=len(words)))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    client = FakeChatClient()
+    for i in range(n):
+        stats = {}
+        text = "".join(stream_chat(client, "gpt-4o", [{"role": "user", "content": f"question {i}"}], stats))
+        print(f"#{i}: ttft {stats['ttft_ms']:.0f} ms, total {stats['total_ms']:.0f} ms, "
+              f"{stats['tokens']} tokens, {stats['tokens_per_s']:.1f} tok/s")
@@ -2,38 +2,77 @@ import streamlit as st
 import pandas as pd
 import os
 
+from columnar_cache import read_csv_cached
+from analytics_engine import SHARD_BYTES, PartitionedAnalytics, partial, summarize_grouped
+
+
+@st.cache_resource
+def analytics_engine():
+    # shared process pool and per-shard partials for every session
+    return PartitionedAnalytics()
+
+
 class TicketAnalytics:
-    def __init__(self):
+    def __init__(self, engine=None, partitioned=None):
         # Path to CSV
         self.file_path = os.path.join("app", "data", "it_tickets.csv")
-        self.df = self.load_data()
+        if partitioned is None:
+            # below a couple of shards, one in-process pass is cheaper than workers + partial files
+            shard_bytes = engine.shard_bytes if engine else SHARD_BYTES
+            partitioned = os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 2 * shard_bytes
+        if partitioned:
+            # per-shard partial aggregates in worker processes; only new shards are parsed
+            self.df = None
+            self.summary = self.summarize_partitioned(engine or analytics_engine())
+        else:
+            self.df = self.load_data()
+            self.summary = self.summarize(self.df) if not self.df.empty else None
+
+    def summarize_partitioned(self, engine):
+        if not os.path.exists(self.file_path):
+            st.error("it_tickets.csv is missing or empty.")
+            return None
+        summary = engine.summarize(self.file_path)
+        return summary if summary['total'] else None
 
     def load_data(self):
         if not os.path.exists(self.file_path):
             st.error("it_tickets.csv is missing or empty.")
             return pd.DataFrame()  # empty dataframe to avoid crashes
 
-        df = pd.read_csv(self.file_path)
+        df = read_csv_cached(self.file_path)  # typed, read from the columnar cache after the first load
         df.columns = [c.strip().lower() for c in df.columns]  # normalize columns
+        return self.normalize(df)
+
+    @staticmethod
+    def normalize(df):
+        """Convert types once at load instead of in every chart."""
+        df['resolution_time_hours'] = pd.to_numeric(df['resolution_time_hours'], errors='coerce')
+        df['status'] = df['status'].astype('category')
+        df['assigned_to'] = df['assigned_to'].astype('category')
         return df
 
+    @staticmethod
+    def summarize(df):
+        """
+        Every KPI and chart series from a single groupby over (assigned_to, status, resolution bucket),
+        the same reduction the partitioned engine runs per shard and merges.
+        """
+        return summarize_grouped(partial(df))
+
     def show_dashboard(self):
-        if self.df.empty:
+        if self.summary is None:
             return
 
         st.subheader("IT Tickets Analytics ")
 
-        # KPI: Total tickets
-        total_tickets = len(self.df)
-        total_open = len(self.df[self.df['status'].str.lower() == 'open'])
-        total_waiting_user = len(self.df[self.df['status'].str.lower() == 'waiting for user'])
-        total_resolved = len(self.df[self.df['status'].str.lower() == 'resolved'])
-
+        # KPIs come from the precomputed summary
+        summary = self.summary
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Tickets", total_tickets)
-        col2.metric("Open Tickets", total_open)
-        col3.metric("Waiting for User", total_waiting_user)
-        col4.metric("Resolved Tickets", total_resolved)
+        col1.metric("Total Tickets", summary['total'])
+        col2.metric("Open Tickets", summary['open'])
+        col3.metric("Waiting for User", summary['waiting_user'])
+        col4.metric("Resolved Tickets", summary['resolved'])
 
         # --- Staff causing longest delays ---
         self.plot_avg_resolution_by_staff()
@@ -44,11 +83,12 @@ class TicketAnalytics:
         # --- Ticket counts per staff ---
         self.plot_ticket_counts_by_staff()
 
+        # --- Resolution time percentiles (tail delays the averages hide) ---
+        self.plot_resolution_percentiles_by_staff()
+        self.plot_resolution_percentiles_by_status()
+
     def plot_avg_resolution_by_staff(self):
-        df = self.df.copy()
-        df['resolution_time_hours'] = pd.to_numeric(df['resolution_time_hours'], errors='coerce')
-        avg_resolution = df.groupby('assigned_to')['resolution_time_hours'].mean().reset_index()
-        avg_resolution = avg_resolution.sort_values(by='resolution_time_hours', ascending=False)
+        avg_resolution = self.summary['avg_by_staff']
 
         st.markdown("### 1. Average Resolution Time by Staff (hours)")
         st.markdown("""
@@ -58,15 +98,12 @@ class TicketAnalytics:
         - IT_Support_B shows variability depending on ticket priority.
         """)
         if not avg_resolution.empty:
-            st.bar_chart(avg_resolution.set_index('assigned_to')['resolution_time_hours'])
+            st.bar_chart(avg_resolution)
         else:
             st.info("No data for staff resolution times.")
 
     def plot_avg_resolution_by_status(self):
-        df = self.df.copy()
-        df['resolution_time_hours'] = pd.to_numeric(df['resolution_time_hours'], errors='coerce')
-        avg_resolution_status = df.groupby('status')['resolution_time_hours'].mean().reset_index()
-        avg_resolution_status = avg_resolution_status.sort_values(by='resolution_time_hours', ascending=False)
+        avg_resolution_status = self.summary['avg_by_status']
 
         st.markdown("### 2. Average Resolution Time by Status (hours)")
         st.markdown("""
@@ -75,14 +112,12 @@ class TicketAnalytics:
         - "In Progress" and "Open" tickets also contribute to delays but are secondary to Waiting for User.
         """)
         if not avg_resolution_status.empty:
-            st.bar_chart(avg_resolution_status.set_index('status')['resolution_time_hours'])
+            st.bar_chart(avg_resolution_status)
         else:
             st.info("No data for status resolution times.")
 
     def plot_ticket_counts_by_staff(self):
-        df = self.df.copy()
-        ticket_counts = df.groupby('assigned_to').size().reset_index(name='ticket_count')
-        ticket_counts = ticket_counts.sort_values(by='ticket_count', ascending=False)
+        ticket_counts = self.summary['count_by_staff']
 
         st.markdown("### 3. Ticket Counts per Staff")
         st.markdown("""
@@ -91,6 +126,35 @@ class TicketAnalytics:
         - IT_Support_C handles fewer tickets but takes longer, highlighting potential workload or skill mismatch.
         """)
         if not ticket_counts.empty:
-            st.bar_chart(ticket_counts.set_index('assigned_to')['ticket_count'])
+            st.bar_chart(ticket_counts)
+        else:
+            st.info("No ticket count data.")
+
+    def plot_resolution_percentiles_by_staff(self):
+        percentiles = self.summary['pct_by_staff']
+
+        st.markdown("### 4. Resolution Time Percentiles by Staff (hours)")
+        st.markdown("""
+        **Observations:**
+        - p50 is the typical ticket; p90 and p99 show how long the slowest tickets take.
+        - A staff member whose p99 is far above their p50 has a few tickets stalling for a long time, which the average smooths over.
+        """)
+        if not percentiles.empty:
+            st.bar_chart(percentiles[['p50', 'p90', 'p99']], stack=False)
+            st.dataframe(percentiles)
+        else:
+            st.info("No data for staff resolution percentiles.")
+
+    def plot_resolution_percentiles_by_status(self):
+        percentiles = self.summary['pct_by_status']
+
+        st.markdown("### 5. Resolution Time Percentiles by Status (hours)")
+        st.markdown("""
+        **Observations:**
+        - Statuses with a high p90 hold the long-running tickets; compare with the averages in chart 2.
+        """)
+        if not percentiles.empty:
+            st.bar_chart(percentiles[['p50', 'p90', 'p99']], stack=False)
+            st.dataframe(percentiles)
         else:
-            st.info("No ticket count data.")
\ No newline at end of file
+            st.info("No data for status resolution percentiles.")
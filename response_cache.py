@@ -0,0 +1,103 @@
+# response_cache.py
+"""
+Shared cache for AI assistant replies
+- key: model + domain system prompt + normalized conversation context
+  (case, whitespace and trailing punctuation don't matter)
+- memory tier: LRU with a TTL, shared by every session in the process
+- disk tier: SQLite table in ai_cache.db, survives restarts and is shared
+  by website.py and ai.py
+- stats(): hits per tier, misses, hit ratio and model latency saved
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DB = "ai_cache.db"
+MAX_ENTRIES = 512
+TTL_S = 24 * 3600
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().lower().rstrip("?!. ")
+
+
+def make_key(model, system_prompt, turns) -> str:
+    """turns: [(role, text), ...] ending with the new user prompt."""
+    payload = [model, normalize(system_prompt), [(role, normalize(text)) for role, text in turns]]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path=CACHE_DB, max_entries=MAX_ENTRIES, ttl_s=TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._memory = OrderedDict()  # key -> (created_at, reply, latency_ms)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "saved_ms": 0.0}
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_response_cache (
+                    key TEXT PRIMARY KEY,
+                    reply TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute("DELETE FROM ai_response_cache WHERE created_at < ?", (time.time() - ttl_s,))
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached reply for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            tier = "memory_hits"
+            if entry is not None and now - entry[0] > self.ttl_s:
+                del self._memory[key]
+                entry = None
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT created_at, reply, latency_ms FROM ai_response_cache WHERE key=? AND created_at >= ?",
+                    (key, now - self.ttl_s)
+                ).fetchone()
+                if row is not None:
+                    entry = tuple(row)
+                    self._remember(key, entry)
+                    tier = "disk_hits"
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._memory.move_to_end(key)
+            self._stats[tier] += 1
+            self._stats["saved_ms"] += entry[2]
+            return entry[1]
+
+    def put(self, key, reply, latency_ms):
+        """Store a model reply and how long the model took to produce it."""
+        if not reply:
+            return
+        entry = (time.time(), reply, float(latency_ms))
+        with self._lock:
+            self._remember(key, entry)
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO ai_response_cache VALUES (?,?,?,?)", (key, reply, entry[2], entry[0]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._memory)
+        hits = s["memory_hits"] + s["disk_hits"]
+        s["hit_ratio"] = hits / (hits + s["misses"]) if hits + s["misses"] else 0.0
+        return s
@@ -0,0 +1,226 @@
+# retrieval.py
+"""
+Local retrieval over incident and ticket descriptions for the AI assistants
+- in-process BM25 inverted index: term -> (doc ids, term frequencies)
+  stored in compact arrays, scored with numpy
+- incremental: sync() reads rows with id above the last indexed id and
+  the changelog (changefeed.py) past the last seen entry; updated or
+  deleted rows have their old document tombstoned (masked out of scoring)
+  and are re-read, while a reload or a gap left by pruning rebuilds the
+  index. Without a changelog only new rows are picked up
+- syncs closer together than MIN_SYNC_S are skipped unless forced (the
+  write queue forces one after each commit), so asking questions doesn't
+  re-check the database every time
+- once tombstones outnumber live documents the index is rebuilt
+- search() returns the top-k records, context_for() formats them for the prompt
+"""
+
+import math
+import re
+import threading
+import time
+from array import array
+
+import numpy as np
+
+import schema
+
+SYNC_BATCH = 50_000
+MIN_SYNC_S = 2.0
+REFRESH_BATCH = 500  # ids per SELECT when re-reading updated rows
+TOP_K = 5
+K1, B = 1.2, 0.75  # BM25 parameters
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how i in is it its of on or that the this to was what when
+where which who why will with do does did my our we you your can should could would me
+""".split())
+
+# table -> (columns fetched, formatter)
+SOURCES = {
+    "cyber_incidents": (
+        "id, incident_id, severity, category, status, timestamp, description",
+        lambda r: f"Incident {r[1]} [{r[2]} | {r[3]} | {r[4]} | {r[5]}]: {r[6]}",
+    ),
+    "it_tickets": (
+        "id, ticket_id, priority, status, assigned_to, created_at, description",
+        lambda r: f"Ticket {r[1]} [{r[2]} | {r[3]} | {r[4]} | {r[5]}]: {r[6]}",
+    ),
+}
+TABLES = list(SOURCES)
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if t not in STOPWORDS]
+
+
+class RetrievalIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_sync = None
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}        # term -> (array of doc ids, array of term counts)
+        self._doc_table = array("B")
+        self._doc_rowid = array("q")
+        self._doc_len = array("I")
+        self._live = array("B")    # 0 once a document is superseded or its row deleted
+        self._dead = 0
+        self._total_len = 0        # over live documents
+        self._hwm = {t: 0 for t in TABLES}     # highest id indexed per table
+        self._seq = None           # last changelog entry applied; None until the first sync
+
+    def __len__(self):
+        return len(self._doc_rowid) - self._dead
+
+    def _add(self, table_no, row_id, text):
+        doc = len(self._doc_rowid)
+        terms = tokenize(text)
+        counts = {}
+        for t in terms:
+            counts[t] = counts.get(t, 0) + 1
+        for t, n in counts.items():
+            p = self._postings.get(t)
+            if p is None:
+                p = self._postings[t] = (array("I"), array("H"))
+            p[0].append(doc)
+            p[1].append(min(n, 65535))
+        self._doc_table.append(table_no)
+        self._doc_rowid.append(row_id)
+        self._doc_len.append(len(terms))
+        self._live.append(1)
+        self._total_len += len(terms)
+
+    def _docs_for(self, table_no, row_ids):
+        """Live documents indexing any of row_ids in table_no."""
+        rowid = np.frombuffer(self._doc_rowid, dtype=np.int64)
+        mask = np.isin(rowid, np.fromiter(row_ids, dtype=np.int64, count=len(row_ids)))
+        mask &= np.frombuffer(self._doc_table, dtype=np.uint8) == table_no
+        mask &= np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        return np.flatnonzero(mask).tolist()
+
+    def _refresh(self, conn, table_no, row_ids):
+        """Tombstone the documents of row_ids and index their current text (deleted rows stay out)."""
+        for doc in self._docs_for(table_no, row_ids):
+            self._live[doc] = 0
+            self._dead += 1
+            self._total_len -= self._doc_len[doc]
+        row_ids = sorted(row_ids)
+        for i in range(0, len(row_ids), REFRESH_BATCH):
+            chunk = row_ids[i:i + REFRESH_BATCH]
+            rows = conn.execute(
+                f"SELECT id, description FROM {TABLES[table_no]} WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for row_id, text in rows:
+                self._add(table_no, row_id, text)
+
+    @staticmethod
+    def _changelog_bounds(conn):
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='changelog'").fetchone():
+            return None, None
+        lo, hi = conn.execute("SELECT MIN(seq), MAX(seq) FROM changelog").fetchone()
+        return lo, hi or 0
+
+    def sync(self, conn, force=False) -> int:
+        """
+        Apply changes since the last sync (skipped if the last one was under
+        MIN_SYNC_S ago, unless force). Returns the number of rows (re)indexed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_sync is not None and now - self._last_sync < MIN_SYNC_S:
+                return 0
+            self._last_sync = now
+            if not conn.in_transaction:
+                conn.execute("BEGIN")  # one snapshot for the changelog and the rows
+            lo_seq, hi_seq = self._changelog_bounds(conn)
+            stale = {t: set() for t in TABLES}
+            rebuild = self._seq is None or self._dead > len(self)
+            if not rebuild and hi_seq is not None:
+                if hi_seq < self._seq or (lo_seq is not None and lo_seq > self._seq + 1):
+                    rebuild = True  # changelog recreated, or entries we needed were pruned
+                elif hi_seq > self._seq:
+                    entries = conn.execute(
+                        f"SELECT tbl, op, first_id FROM changelog WHERE seq > ? AND tbl IN ({','.join('?' * len(TABLES))})",
+                        (self._seq, *TABLES)
+                    ).fetchall()
+                    for table, op, row_id in entries:
+                        if op == "reload":
+                            rebuild = True
+                            break
+                        if op in ("update", "delete") and row_id <= self._hwm[table]:
+                            stale[table].add(row_id)  # rows above the high-water mark are read below anyway
+            if rebuild:
+                self._reset()
+            self._seq = hi_seq or 0
+
+            added = 0
+            for table_no, table in enumerate(TABLES):
+                if stale[table] and not rebuild:
+                    self._refresh(conn, table_no, stale[table])
+                    added += len(stale[table])
+                while True:
+                    rows = conn.execute(
+                        f"SELECT id, description FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                        (self._hwm[table], SYNC_BATCH)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for row_id, text in rows:
+                        self._add(table_no, row_id, text)
+                    self._hwm[table] = rows[-1][0]
+                    added += len(rows)
+            return added
+
+    def search(self, query, k=TOP_K):
+        """Top-k (score, table, row id) for query, best first."""
+        with self._lock:
+            n_docs = len(self)
+            terms = set(tokenize(query))
+            if not n_docs or not terms:
+                return []
+            live = np.frombuffer(self._live, dtype=np.uint8).astype(bool) if self._dead else None
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+            norm = K1 * (1 - B + B * doc_len / (self._total_len / n_docs))
+            scores = np.zeros(len(doc_len), dtype=np.float32)
+            for t in terms:
+                p = self._postings.get(t)
+                if p is None:
+                    continue
+                docs = np.frombuffer(p[0], dtype=np.uint32)
+                tf = np.frombuffer(p[1], dtype=np.uint16).astype(np.float32)
+                if live is not None:
+                    keep = live[docs]
+                    docs, tf = docs[keep], tf[keep]
+                    if not len(docs):
+                        continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += idf * tf * (K1 + 1) / (tf + norm[docs])
+            k = min(k, int(np.count_nonzero(scores)))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[d]), TABLES[self._doc_table[d]], self._doc_rowid[d]) for d in top]
+
+    @staticmethod
+    def records(conn, hits):
+        """Format hits as one line per record, in hit order."""
+        lines = []
+        for _, table, row_id in hits:
+            cols, fmt = SOURCES[table]
+            row = conn.execute(f"SELECT {cols} FROM {schema.view(table)} WHERE id=?", (row_id,)).fetchone()
+            if row is not None:
+                lines.append(fmt(row))
+        return lines
+
+
+def context_for(index, pool, question, k=TOP_K):
+    """Sync the index (throttled), retrieve the top-k records for question and format a prompt block ('' if none)."""
+    with pool.connection() as conn:
+        index.sync(conn)
+        lines = index.records(conn, index.search(question, k))
+    if not lines:
+        return ""
+    return "Relevant records from our incident and ticket database:\n" + "\n".join(f"- {l}" for l in lines)
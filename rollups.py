@@ -0,0 +1,180 @@
+# rollups.py
+"""
+Materialized time-series rollups for the trend charts
+- <table>_hourly and <table>_daily hold row counts per
+  (bucket, dim1, dim2): (severity, category) for incidents and
+  (priority, status) for tickets
+- buckets are epoch seconds truncated to the hour / day and dims are the
+  enum codes (see schema.py), so the triggers do integer arithmetic only
+- insert / update / delete triggers upsert the counts, so every writer
+  (dashboard forms, ingest.py bulk loads, data.py) keeps them current
+- a rollup created over an existing table is backfilled once
+- bulk(): ingest.py pauses the triggers for a bulk load and folds the
+  loaded rows in with one GROUP BY afterwards (per-row upserts make a
+  large load several times slower)
+- trend() reads only the rollups (and the small lookup tables); weeks
+  are summed from the daily table
+- DISTRIBUTIONS are rollups of the same shape keyed by a value bucket
+  instead of a time bucket: each (dim1, dim2) cell is a mergeable quantile
+  sketch (sketches.py) and percentiles() merges them per staff / status
+Rows without a timestamp (or value) are left out of the rollups.
+"""
+
+from contextlib import contextmanager
+
+import pandas as pd
+
+import schema
+import sketches
+
+# table -> (timestamp column, (dim1, dim2))
+ROLLUPS = {
+    "cyber_incidents": ("timestamp", ("severity", "category")),
+    "it_tickets": ("created_at", ("priority", "status")),
+}
+# grain -> (rollup suffix, SQL bucket expression over an epoch timestamp)
+GRAINS = {
+    "hour": ("hourly", "({0}) / 3600 * 3600"),
+    "day": ("daily", "({0}) / 86400 * 86400"),
+}
+# table -> (rollup suffix, value column, (dim1, dim2)) for value-distribution sketches
+DISTRIBUTIONS = {
+    "it_tickets": ("resolution", "resolution_time_hours", ("assigned_to", "status")),
+}
+WEEK_BUCKET = "CAST(strftime('%s', bucket, 'unixepoch', '-6 days', 'weekday 1') AS INTEGER)"
+
+
+def _upsert(rollup, bucket, dims, sign, ref):
+    """Trigger statement adding sign (+1 / -1) for row ref (new / old)."""
+    d1, d2 = dims
+    key = f"{bucket}, COALESCE({ref}.{d1}, 0), COALESCE({ref}.{d2}, 0)"
+    sql = f"""
+            INSERT INTO {rollup} (bucket, {d1}, {d2}, n)
+            SELECT {key}, {sign} WHERE {bucket} IS NOT NULL
+            ON CONFLICT (bucket, {d1}, {d2}) DO UPDATE SET n = n + excluded.n;"""
+    if sign < 0:  # drop emptied buckets (primary-key lookup)
+        sql += f"""
+            DELETE FROM {rollup} WHERE (bucket, {d1}, {d2}) = ({key}) AND n = 0;"""
+    return sql
+
+
+def _specs(table):
+    """[(rollup, column, bucket expression template, (dim1, dim2))] maintained for table."""
+    specs = []
+    if table in ROLLUPS:
+        ts, dims = ROLLUPS[table]
+        specs += [(f"{table}_{suffix}", ts, expr, dims) for suffix, expr in GRAINS.values()]
+    if table in DISTRIBUTIONS:
+        suffix, column, dims = DISTRIBUTIONS[table]
+        specs.append((f"{table}_{suffix}", column, sketches.bucket_sql("{0}"), dims))
+    return specs
+
+
+def _fold(conn, table, spec, after_id=0):
+    """Add the rows of table with id > after_id to the rollup in one pass."""
+    rollup, column, expr, (d1, d2) = spec
+    bucket = expr.format(column)
+    conn.execute(f"""
+        INSERT INTO {rollup} (bucket, {d1}, {d2}, n)
+        SELECT {bucket}, COALESCE({d1}, 0), COALESCE({d2}, 0), COUNT(*)
+        FROM {table} WHERE id > ? AND {bucket} IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (bucket, {d1}, {d2}) DO UPDATE SET n = n + excluded.n
+    """, (after_id,))
+
+
+def ensure_rollups(conn, table):
+    """Create table's rollups and their triggers if missing (backfilling existing rows)."""
+    conn.execute("CREATE TABLE IF NOT EXISTS rollup_paused (tbl TEXT PRIMARY KEY)")
+    paused = f"NOT EXISTS (SELECT 1 FROM rollup_paused WHERE tbl = '{table}')"
+    for spec in _specs(table):
+        rollup, column, expr, dims = spec
+        d1, d2 = dims
+        new_bucket, old_bucket = expr.format(f"new.{column}"), expr.format(f"old.{column}")
+        trigger = conn.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (f"{rollup}_ai",)).fetchone()
+        if trigger and new_bucket not in trigger[0]:
+            # built with a different bucket expression (GRAINS / sketches changed): rebuild it
+            for op in ("ai", "ad", "au"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {rollup}_{op}")
+            conn.execute(f"DROP TABLE IF EXISTS {rollup}")
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (rollup,)).fetchone()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup} (
+                bucket INTEGER NOT NULL, {d1} INTEGER NOT NULL, {d2} INTEGER NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (bucket, {d1}, {d2})
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_ai AFTER INSERT ON {table}
+            WHEN {paused} BEGIN
+                {_upsert(rollup, new_bucket, dims, 1, "new")}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_ad AFTER DELETE ON {table}
+            WHEN {paused} BEGIN
+                {_upsert(rollup, old_bucket, dims, -1, "old")}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_au AFTER UPDATE OF {column}, {d1}, {d2} ON {table}
+            WHEN {paused} BEGIN
+                {_upsert(rollup, old_bucket, dims, -1, "old")}
+                {_upsert(rollup, new_bucket, dims, 1, "new")}
+            END
+        """)
+        if not exists:
+            _fold(conn, table, spec)
+
+
+@contextmanager
+def bulk(conn, table, full=False):
+    """
+    Pause table's rollup triggers for a bulk load inside the caller's
+    transaction, then fold the new rows in (full=True: the table was
+    emptied first, so the rollups are rebuilt). On an exception the caller
+    must roll back, which also undoes the pause.
+    """
+    if not _specs(table) or not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='rollup_paused'").fetchone():
+        yield
+        return
+    after_id = 0 if full else conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    conn.execute("INSERT OR IGNORE INTO rollup_paused VALUES (?)", (table,))
+    yield
+    conn.execute("DELETE FROM rollup_paused WHERE tbl = ?", (table,))
+    for spec in _specs(table):
+        if full:
+            conn.execute(f"DELETE FROM {spec[0]}")
+        _fold(conn, table, spec, after_id)
+
+
+def trend(conn, table, grain, dim) -> pd.DataFrame:
+    """
+    Counts per bucket (index) and value of dim (columns), oldest bucket first.
+    grain: 'hour', 'day' or 'week' (weeks start on Monday).
+    """
+    if dim not in ROLLUPS[table][1]:
+        raise ValueError(f"{table} has no rollup by {dim}")
+    suffix = GRAINS["hour" if grain == "hour" else "day"][0]
+    bucket = WEEK_BUCKET if grain == "week" else "bucket"
+    df = pd.read_sql_query(
+        f"SELECT {bucket} AS bucket, {dim}, SUM(n) AS n FROM {table}_{suffix} GROUP BY 1, 2 ORDER BY 1",
+        conn,
+    )
+    names = schema.labels(conn, schema.enum_of(table, dim))
+    df[dim] = df[dim].map(lambda code: names.get(code, ""))
+    out = df.pivot_table(index="bucket", columns=dim, values="n", aggfunc="sum", fill_value=0).astype("int64")
+    out.index = pd.to_datetime(out.index, unit="s")
+    return out
+
+
+def percentiles(conn, table, dim) -> pd.DataFrame:
+    """p50 / p90 / p99 and count of the table's distribution column per value of dim, highest p90 first."""
+    suffix, _, dims = DISTRIBUTIONS[table]
+    if dim not in dims:
+        raise ValueError(f"{table} has no distribution by {dim}")
+    df = pd.read_sql_query(f"SELECT {dim}, bucket, SUM(n) AS n FROM {table}_{suffix} GROUP BY 1, 2", conn)
+    names = schema.labels(conn, schema.enum_of(table, dim))
+    df[dim] = df[dim].map(lambda code: names.get(code, ""))
+    return sketches.percentile_table(df.set_index([dim, "bucket"])["n"], dim)
@@ -0,0 +1,243 @@
+# schema.py
+"""
+Versioned schema for intelligence_platform.db (shared by website.py and data.py)
+- migrate() brings a database up to SCHEMA_VERSION, one step per
+  PRAGMA user_version, each step in its own write transaction
+- timestamps are stored as INTEGER epoch seconds (sortable, 8 bytes at most)
+- low-cardinality text (severity, category, status, priority, staff) is
+  stored as an integer code pointing into an enum_* lookup table; seeded
+  values get codes in their natural order (Low < Medium < High < Critical)
+- <table>_v views decode codes and timestamps back to the original text
+  layout for display; filters, sorting and GROUP BY run on the codes
+- insert() encodes rows (DataFrame or list of dicts) for every writer
+"""
+
+import pandas as pd
+
+SCHEMA_VERSION = 2
+
+# lookup table -> seed values, in code order
+ENUMS = {
+    "enum_severity": ["Low", "Medium", "High", "Critical"],
+    "enum_priority": ["Low", "Medium", "High", "Critical"],
+    "enum_incident_category": ["Malware", "Phishing", "DDoS", "Unauthorized Access", "Data Leak", "Misconfiguration"],
+    "enum_incident_status": ["Open", "In Progress", "Resolved", "Closed"],
+    "enum_ticket_status": ["Open", "In Progress", "Waiting for User", "Resolved", "Closed"],
+    "enum_staff": [],
+}
+# enums whose code order is meaningful (Low < Medium < High < Critical)
+ORDERED_ENUMS = {"enum_severity", "enum_priority"}
+
+# table -> [(column, kind)]; kind is a SQL type, "datetime" / "date" (epoch seconds) or an ENUMS table;
+# ids are TEXT because the CSVs use numbers and the dashboard forms "INC-..." / "TICKET-..."
+TABLES = {
+    "cyber_incidents": [
+        ("incident_id", "TEXT"), ("timestamp", "datetime"), ("severity", "enum_severity"),
+        ("category", "enum_incident_category"), ("status", "enum_incident_status"), ("description", "TEXT"),
+        ("title", "TEXT"), ("resolved_date", "date"), ("resolution_time_hours", "REAL"),
+    ],
+    "datasets": [
+        ("dataset_id", "INTEGER"), ("name", "TEXT"), ("rows", "INTEGER"),
+        ("columns", "INTEGER"), ("uploaded_by", "TEXT"), ("upload_date", "date"),
+        ("source_department", "TEXT"), ("size_mb", "REAL"), ("quality_score", "REAL"), ("last_accessed", "date"),
+    ],
+    "it_tickets": [
+        ("ticket_id", "TEXT"), ("priority", "enum_priority"), ("description", "TEXT"),
+        ("status", "enum_ticket_status"), ("assigned_to", "enum_staff"), ("created_at", "datetime"),
+        ("resolution_time_hours", "INTEGER"),
+        ("title", "TEXT"), ("resolved_date", "date"), ("current_stage", "TEXT"),
+    ],
+}
+
+INDEXES = {
+    "cyber_incidents": ["timestamp", "severity", "category", "status"],
+    "datasets": ["upload_date", "uploaded_by"],
+    "it_tickets": ["created_at", "priority", "status", "assigned_to"],
+}
+
+# objects derived from the tables; dropped when a table is rebuilt and
+# recreated by search.ensure_fts / rollups.ensure_rollups / changefeed.ensure_changelog
+DERIVED_TABLES = [
+    "cyber_incidents_fts", "it_tickets_fts",
+    "cyber_incidents_hourly", "cyber_incidents_daily", "it_tickets_hourly", "it_tickets_daily", "it_tickets_resolution",
+    "rollup_paused",
+    "changelog", "changelog_paused",
+]
+
+_TIME_FORMATS = {"datetime": "datetime({}, 'unixepoch')", "date": "date({}, 'unixepoch')"}
+
+
+def view(table):
+    return f"{table}_v"
+
+
+def kind(table, column):
+    return dict(TABLES.get(table, [])).get(column)
+
+
+def enum_of(table, column):
+    """Lookup table behind table.column, or None if the column isn't an enum."""
+    k = kind(table, column)
+    return k if k in ENUMS else None
+
+
+def labels(conn, enum):
+    """{code: name} for an enum lookup table."""
+    return dict(conn.execute(f"SELECT code, name FROM {enum}"))
+
+
+def codes(conn, enum, names):
+    """{name: code} for names, adding unseen names to the lookup table."""
+    names = [n for n in set(names) if n is not None]
+    conn.executemany(f"INSERT OR IGNORE INTO {enum} (name) VALUES (?)", [(n,) for n in names])
+    return {n: c for c, n in labels(conn, enum).items()}
+
+
+def _epoch_seconds(values):
+    ts = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True)
+    return (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def encode(conn, table, df):
+    """Typed copy of df for table: enums -> codes, timestamps -> epoch seconds, NaN -> None."""
+    df = df.copy()
+    for col in df.columns:
+        k = kind(table, col)
+        if k in ENUMS:
+            names = df[col].where(df[col].notna(), None).map(lambda v: str(v).strip() or None if v is not None else None)
+            df[col] = names.map(codes(conn, k, names.dropna().unique()))
+        elif k in _TIME_FORMATS:
+            df[col] = _epoch_seconds(df[col]).astype("Int64")
+    df = df.astype(object)
+    return df.where(df.notna(), None)
+
+
+def insert(conn, table, data) -> int:
+    """Encode and insert rows (a DataFrame or a list of dicts keyed by column). Returns rows inserted."""
+    df = encode(conn, table, data if isinstance(data, pd.DataFrame) else pd.DataFrame(data))
+    cols = list(df.columns)
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        df.itertuples(index=False, name=None),
+    )
+    return len(df)
+
+
+# ---------- migrations ----------
+def _v1_baseline(conn):
+    """The original loosely typed layout (what website.init_db created)."""
+    conn.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password_hash TEXT)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cyber_incidents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incident_id TEXT, timestamp TEXT, severity TEXT,
+            category TEXT, status TEXT, description TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS datasets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dataset_id INTEGER, name TEXT, rows INTEGER,
+            columns INTEGER, uploaded_by TEXT, upload_date TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS it_tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER, priority TEXT, description TEXT,
+            status TEXT, assigned_to TEXT, created_at TEXT,
+            resolution_time_hours INTEGER
+        )
+    ''')
+
+
+def _column_sql(col, k):
+    if k in ENUMS:
+        return f"{col} INTEGER REFERENCES {k}(code)"
+    return f"{col} {'INTEGER' if k in _TIME_FORMATS else k}"
+
+
+def _convert_sql(col, k, legacy):
+    """SQL converting a legacy text column to its typed value (NULL for columns v1 didn't have)."""
+    if col not in legacy:
+        return "NULL"
+    if k in ENUMS:
+        return f"(SELECT code FROM {k} WHERE name = NULLIF(TRIM({col}), ''))"
+    if k in _TIME_FORMATS:
+        return f"CAST(strftime('%s', {col}) AS INTEGER)"
+    return col
+
+
+def _create_view(conn, table):
+    select, joins = ["t.id"], []
+    for col, k in TABLES[table]:
+        if k in ENUMS:
+            joins.append(f"LEFT JOIN {k} {col}_l ON {col}_l.code = t.{col}")
+            select.append(f"{col}_l.name AS {col}")
+        elif k in _TIME_FORMATS:
+            select.append(f"{_TIME_FORMATS[k].format('t.' + col)} AS {col}")
+        else:
+            select.append(f"t.{col}")
+    conn.execute(f"DROP VIEW IF EXISTS {view(table)}")
+    conn.execute(f"CREATE VIEW {view(table)} AS SELECT {', '.join(select)} FROM {table} t {' '.join(joins)}")
+
+
+def _v2_typed(conn):
+    """Epoch timestamps, enum codes with lookup tables, decoding views and indexes."""
+    for enum, seed in ENUMS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {enum} (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        conn.executemany(f"INSERT OR IGNORE INTO {enum} (name) VALUES (?)", [(v,) for v in seed])
+    for name in DERIVED_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+
+    for table, columns in TABLES.items():
+        legacy = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for col, k in columns:
+            if k in ENUMS and col in legacy:
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO {k} (name)
+                    SELECT DISTINCT TRIM({col}) FROM {table} WHERE NULLIF(TRIM({col}), '') IS NOT NULL
+                """)
+        cols = [c for c, _ in columns]
+        conn.execute(f"""
+            CREATE TABLE {table}_typed (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {', '.join(_column_sql(c, k) for c, k in columns)}
+            )
+        """)
+        conn.execute(f"""
+            INSERT INTO {table}_typed (id, {', '.join(cols)})
+            SELECT id, {', '.join(_convert_sql(c, k, legacy) for c, k in columns)} FROM {table}
+        """)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_typed RENAME TO {table}")
+        for col in INDEXES[table]:
+            conn.execute(f"CREATE INDEX idx_{table}_{col} ON {table} ({col})")
+        _create_view(conn, table)
+
+    user_cols = [r[1] for r in conn.execute("PRAGMA table_info(users)")]
+    if "role" not in user_cols:
+        conn.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'user'")
+
+
+MIGRATIONS = [(1, _v1_baseline), (2, _v2_typed)]
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations. Returns the schema version."""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]  # another process may have migrated
+        for target, step in MIGRATIONS:
+            if target > version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                version = target
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return version
@@ -0,0 +1,139 @@
+# search.py
+"""
+Full-text search over incident and ticket descriptions (SQLite FTS5)
+- one external-content FTS5 table per source table: the text lives only in
+  the source table, the FTS table holds just the inverted index
+- insert / update / delete triggers keep the index in sync with every
+  writer (the dashboard forms, ingest.py, data.py)
+- an index created over an existing table is filled once with 'rebuild'
+- user input is tokenized and every token quoted, so FTS5 operators and
+  punctuation in a query can't cause syntax errors (the porter tokenizer
+  already matches "phish" to "phishing")
+- search_box() renders ranked (bm25), highlighted, paginated hits; a query
+  with more than COUNT_CAP hits is shown newest first instead, since
+  ranking would have to score every match
+"""
+
+import math
+import re
+
+import pandas as pd
+import streamlit as st
+
+import schema
+
+# source table -> (fts table, columns shown with each hit)
+FTS_TABLES = {
+    "cyber_incidents": ("cyber_incidents_fts", ["incident_id", "timestamp", "severity", "category", "status"]),
+    "it_tickets": ("it_tickets_fts", ["ticket_id", "created_at", "priority", "status", "assigned_to"]),
+}
+PAGE_SIZE = 10
+COUNT_CAP = 10_000  # beyond this the hit count is shown as "10,000+"
+HL_START, HL_END = "\x01", "\x02"
+
+
+def ensure_fts(conn, table):
+    """Create table's FTS index and sync triggers if missing (and index existing rows)."""
+    fts = FTS_TABLES[table][0]
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)).fetchone()
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+        USING fts5(description, content='{table}', content_rowid='id', tokenize='porter unicode61')
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, description) VALUES (new.id, new.description);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, description) VALUES ('delete', old.id, old.description);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF description ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO {fts}(rowid, description) VALUES (new.id, new.description);
+        END
+    """)
+    if not exists:
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def match_query(text):
+    """User text -> FTS5 MATCH expression (all tokens required), or None if there are no tokens."""
+    tokens = re.findall(r"\w+", text or "")
+    if not tokens:
+        return None
+    return " ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+
+
+def search(conn, table, query, limit=PAGE_SIZE, offset=0, ranked=True):
+    """
+    Hits for query as a DataFrame: id, shown columns and highlighted description.
+    ranked: best bm25 match first, otherwise newest first (cheap for very common terms).
+    """
+    fts, cols = FTS_TABLES[table]
+    order = f"{fts}.rank" if ranked else f"{fts}.rowid DESC"
+    sql = f"""
+        SELECT t.id, {', '.join('t.' + c for c in cols)},
+               highlight({fts}, 0, ?, ?) AS description
+        FROM {fts} JOIN {schema.view(table)} t ON t.id = {fts}.rowid
+        WHERE {fts} MATCH ?
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    """
+    return pd.read_sql_query(sql, conn, params=[HL_START, HL_END, query, limit, offset])
+
+
+def count_hits(conn, table, query, cap=COUNT_CAP):
+    """Number of hits, counted up to cap + 1."""
+    fts = FTS_TABLES[table][0]
+    return conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {fts} WHERE {fts} MATCH ? LIMIT ?)", (query, cap + 1)
+    ).fetchone()[0]
+
+
+def _markdown(text):
+    """Escape markdown in a highlighted snippet and turn the highlight markers into bold."""
+    text = re.sub(r"([\\`*_{}\[\]()#+\-.!|>~<])", r"\\\1", text or "")
+    return text.replace(HL_START, "**").replace(HL_END, "**")
+
+
+def search_box(pool, cache, table, label="Search descriptions"):
+    """
+    Render a search box over table's descriptions with paginated results.
+    Results are cached per table version like the paginated tables.
+    """
+    def cached(key, fn):
+        def load():
+            with pool.connection() as conn:
+                return fn(conn)
+        return cache.get(table, key, load)
+
+    text = st.text_input(label, key=f"{table}_search", placeholder="e.g. phishing email")
+    query = match_query(text)
+    if query is None:
+        return
+
+    total = cached(("search_count", query), lambda conn: count_hits(conn, table, query))
+    if not total:
+        st.info("No matches.")
+        return
+    pages = max(1, math.ceil(min(total, COUNT_CAP) / PAGE_SIZE))
+    if st.session_state.get(f"{table}_search_page", 1) > pages:
+        st.session_state[f"{table}_search_page"] = pages  # a new query has fewer hits
+    page = st.number_input(f"Results page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1,
+                           key=f"{table}_search_page")
+    offset = (page - 1) * PAGE_SIZE
+
+    ranked = total <= COUNT_CAP
+    hits = cached(("search", query, offset, ranked), lambda conn: search(conn, table, query, PAGE_SIZE, offset, ranked))
+    cols = FTS_TABLES[table][1]
+    for row in hits.itertuples(index=False):
+        meta = " | ".join(str(getattr(row, c)) for c in cols[1:])
+        st.markdown(f"**{getattr(row, cols[0])}** · {meta}  \n{_markdown(row.description)}")
+    if ranked:
+        st.caption(f"Hits {offset + 1:,}–{offset + len(hits):,} of {total:,}, best match first")
+    else:
+        st.caption(f"Hits {offset + 1:,}–{offset + len(hits):,} of {COUNT_CAP:,}+, newest first (add words to rank by relevance)")
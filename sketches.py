@@ -0,0 +1,80 @@
+# sketches.py
+"""
+Mergeable quantile sketches for resolution times (p50 / p90 / p99)
+- log-linear buckets (HDR-histogram style) over value * SCALE (1/64 hour
+  units): below 2**SIG_BITS units (2 hours) every unit is a bucket, above
+  that values are rounded down to SIG_BITS significant bits, so a bucket is
+  at most 1/64 of its values wide. A bucket is represented by its midpoint:
+  within 0.8% of any value in it from 2 hours up, within 1/128 hour (~30 s)
+  below; a sketch is bucket -> count
+- sketches merge by adding counts, so per-shard / per-group sketches
+  combine exactly (per staff = sum over statuses, whole table = sum of shards)
+- bucket_sql() is the same bucketing as a plain integer SQL expression
+  (no math functions needed), so rollups.py can keep a sketch table per
+  (staff, status) current with triggers
+- quantiles() / percentile_table() read sketches held as pandas count
+  Series (rollups.percentiles, analytics_engine.py partials)
+"""
+
+import numpy as np
+import pandas as pd
+
+SCALE = 64     # bucketing unit: 1/SCALE of the value's unit (hours)
+SIG_BITS = 7
+MAX_BITS = 40  # values of 2**MAX_BITS units (~1.7e10 hours) or more are left out
+QUANTILES = {"p50": 0.50, "p90": 0.90, "p99": 0.99}
+
+
+def bucket(values) -> pd.Series:
+    """Bucket of each value; NaN for missing / text / negative / too large (like bucket_sql)."""
+    v = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(v):
+        v = v.where(~v.map(lambda x: isinstance(x, str)))  # SQL typeof 'text' is never bucketed
+    v = pd.to_numeric(v, errors="coerce").astype("float64") * SCALE
+    ok = v.notna() & (v >= 0) & (v < 2 ** MAX_BITS)
+    ints = np.floor(v.where(ok, 0)).astype(np.int64).to_numpy()
+    shift = np.maximum(np.frexp(ints)[1] - SIG_BITS, 0)
+    return pd.Series((ints >> shift) << shift, index=v.index).where(ok)
+
+
+def bucket_sql(expr) -> str:
+    """SQL expression bucketing expr exactly like bucket() (NULL where it gives NaN, text included)."""
+    v = f"CAST({expr} * {SCALE} AS INTEGER)"
+    cases = [f"WHEN typeof({expr}) NOT IN ('integer', 'real') OR {expr} < 0 THEN NULL",
+             f"WHEN {v} < {1 << SIG_BITS} THEN {v}"]
+    for bits in range(SIG_BITS + 1, MAX_BITS + 1):
+        width = 1 << (bits - SIG_BITS)
+        cases.append(f"WHEN {v} < {1 << bits} THEN {v} / {width} * {width}")
+    return f"(CASE {' '.join(cases)} END)"
+
+
+def _midpoint(b):
+    """Representative value of bucket b: the middle of [b, b + width) units, in the value's unit."""
+    b = int(b)
+    width = 1 << max(b.bit_length() - SIG_BITS, 0)
+    return (b + width / 2) / SCALE
+
+
+def quantiles(counts, qs=QUANTILES) -> dict:
+    """{name: value} for one sketch (a bucket -> count Series), by nearest rank."""
+    counts = counts[counts > 0].sort_index()
+    total = int(counts.sum())
+    if not total:
+        return {name: float("nan") for name in qs}
+    cum = counts.cumsum().to_numpy()
+    buckets = counts.index.to_numpy()
+    return {name: _midpoint(buckets[np.searchsorted(cum, max(1, int(np.ceil(q * total))))]) for name, q in qs.items()}
+
+
+def percentile_table(counts, level, qs=QUANTILES) -> pd.DataFrame:
+    """
+    p50 / p90 / p99 and count per value of index level `level`, from a
+    count Series indexed by (..., level, ..., 'bucket') (the sketches of the
+    other levels are merged).
+    """
+    merged = counts.groupby(level=[level, "bucket"], observed=True).sum()
+    rows = {key: dict(quantiles(group.droplevel(level), qs), count=int(group.sum()))
+            for key, group in merged.groupby(level=level, observed=True)}
+    table = pd.DataFrame.from_dict(rows, orient="index", columns=[*qs, "count"])
+    return table.rename_axis(level).sort_values("p90", ascending=False)
+
@@ -0,0 +1,65 @@
+# startup.py
+"""
+Lazy imports and an import-time report for the Streamlit apps
+- timed_import(name) imports a module and records how long it took
+- lazy_module(name) returns a stand-in that imports the real module on
+  first attribute access, so heavy SDKs (openai, google.generativeai,
+  bcrypt) are only loaded by the pages that use them
+- report() lists the recorded timings, slowest first
+Cold import cost of each heavy module, one fresh interpreter per module:
+    python startup.py [module ...]
+"""
+
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+HEAVY_MODULES = ["streamlit", "pandas", "numpy", "pyarrow", "tiktoken", "bcrypt", "openai", "google.generativeai"]
+
+_times = {}  # module -> ms spent in its first import from this process
+_lock = threading.Lock()
+
+
+def timed_import(name):
+    """import name, recording the time of the first (uncached) import."""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _times.setdefault(name, 1000 * (time.perf_counter() - started))
+    return module
+
+
+class lazy_module:
+    """Module placeholder: the import happens on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(timed_import(self._name), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._name in sys.modules else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def report() -> dict:
+    """{module: import ms} for modules imported through this helper, slowest first."""
+    with _lock:
+        return dict(sorted(_times.items(), key=lambda kv: -kv[1]))
+
+
+def cold_import_ms(name) -> float:
+    """Import time of name in a fresh interpreter (no module cache)."""
+    code = f"import time; t = time.perf_counter(); import {name}; print(1000 * (time.perf_counter() - t))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(out.stdout) if out.returncode == 0 else float("nan")
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or HEAVY_MODULES:
+        print(f"{name:<22} {cold_import_ms(name):8.0f} ms")
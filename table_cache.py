@@ -0,0 +1,70 @@
+# table_cache.py
+"""
+Version-keyed read cache for table queries
+- every table has a version counter; writers call bump(table)
+- cached results are tagged with the version they were read at, so a read
+  after a write misses once and every other rerun is served from memory
+- LRU-bounded, thread-safe, with hit / miss counters
+Cached values are shared between sessions: treat them as read-only.
+"""
+
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 64
+
+
+class TableCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._versions = {}
+        self._entries = OrderedDict()  # (table, key) -> (version, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def version(self, table) -> int:
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def bump(self, *tables):
+        """Invalidate everything cached for the given tables."""
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    def get(self, table, key, loader):
+        """
+        Return the cached value for (table, key) at the table's current version,
+        calling loader() to (re)build it on a miss.
+        """
+        with self._lock:
+            version = self._versions.get(table, 0)
+            entry = self._entries.get((table, key))
+            if entry is not None and entry[0] == version:
+                self._hits += 1
+                self._entries.move_to_end((table, key))
+                return entry[1]
+            self._misses += 1
+
+        value = loader()  # run the query outside the lock
+
+        with self._lock:
+            # don't cache a result that a concurrent write has already made stale
+            if self._versions.get(table, 0) == version:
+                self._entries[(table, key)] = (version, value)
+                self._entries.move_to_end((table, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "versions": dict(self._versions),
+            }
@@ -0,0 +1,136 @@
+# table_view.py
+"""
+Server-side paginated table for the dashboards
+- only the visible page is queried (LIMIT/OFFSET) and sent to the browser
+- column projection: only the selected columns are SELECTed
+- sorting is limited to indexed columns (plus id) so ORDER BY can walk an index
+- filters are pushed down into the WHERE clause
+- rows are displayed from the decoded <table>_v view while filtering and
+  sorting run on the typed table (enum codes, epoch timestamps)
+Column names are checked against PRAGMA table_info before they reach SQL.
+"""
+
+import math
+
+import pandas as pd
+import streamlit as st
+
+import schema
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _display(table):
+    return schema.view(table) if table in schema.TABLES else table
+
+
+def table_columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({_display(table)})")]
+
+
+def indexed_columns(conn, table):
+    """Columns that lead an index on table (id is the rowid, so always sortable)."""
+    cols = ["id"]
+    for idx in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        info = conn.execute(f"PRAGMA index_info({idx[1]})").fetchall()
+        if info and info[0][2] not in cols:
+            cols.append(info[0][2])
+    return cols
+
+
+def build_where(table, filters):
+    """
+    filters: {column: [allowed values]} -> (sql, params) over table aliased t.
+    Enum values are matched through their lookup table. Empty lists are ignored.
+    """
+    clauses, params = [], []
+    for col, values in filters.items():
+        if values:
+            marks = ", ".join("?" * len(values))
+            enum = schema.enum_of(table, col)
+            if enum:
+                clauses.append(f"t.{col} IN (SELECT code FROM {enum} WHERE name IN ({marks}))")
+            else:
+                clauses.append(f"t.{col} IN ({marks})")
+            params.extend(values)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def fetch_page(conn, table, columns, filters, sort_col, descending, limit, offset):
+    """Return one page of table as a DataFrame."""
+    where, params = build_where(table, filters)
+    direction = "DESC" if descending else "ASC"
+    # id as tie-breaker keeps page boundaries stable for non-unique sort keys
+    order = f"t.{sort_col} {direction}" + (f", t.id {direction}" if sort_col != "id" else "")
+    sql = (f"SELECT {', '.join('v.' + c for c in columns)} FROM {table} t "
+           f"JOIN {_display(table)} v ON v.id = t.id{where} ORDER BY {order} LIMIT ? OFFSET ?")
+    return pd.read_sql_query(sql, conn, params=params + [limit, offset])
+
+
+def count_rows(conn, table, filters):
+    where, params = build_where(table, filters)
+    return conn.execute(f"SELECT COUNT(*) FROM {table} t{where}", params).fetchone()[0]
+
+
+def distinct_values(conn, table, column):
+    enum = schema.enum_of(table, column)
+    if enum:  # in code order, e.g. Low, Medium, High, Critical
+        return [r[0] for r in conn.execute(
+            f"SELECT name FROM {enum} WHERE code IN (SELECT DISTINCT {column} FROM {table}) ORDER BY code"
+        )]
+    return [r[0] for r in conn.execute(
+        f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}"
+    )]
+
+
+def paginated_table(pool, cache, table, filter_cols=()):
+    """
+    Render a paginated, filterable view of table.
+    pool: db_pool.ConnectionPool, cache: table_cache.TableCache (results are
+    cached per table version, so reruns without writes don't touch SQLite).
+    """
+    def cached(key, fn):
+        def load():
+            with pool.connection() as conn:
+                return fn(conn)
+        return cache.get(table, key, load)
+
+    all_cols = cached(("columns",), lambda conn: table_columns(conn, table))
+    sortable = cached(("indexed",), lambda conn: indexed_columns(conn, table))
+    filter_cols = [c for c in filter_cols if c in all_cols]
+
+    c1, c2, c3, c4 = st.columns([4, 2, 1, 1])
+    with c1:
+        columns = st.multiselect("Columns", all_cols, default=[c for c in all_cols if c != "id"], key=f"{table}_cols")
+    with c2:
+        sort_col = st.selectbox("Sort by", sortable, key=f"{table}_sort")
+    with c3:
+        descending = st.toggle("Descending", value=True, key=f"{table}_desc")
+    with c4:
+        page_size = st.selectbox("Rows", PAGE_SIZES, key=f"{table}_page_size")
+
+    filters = {}
+    if filter_cols:
+        for col, box in zip(filter_cols, st.columns(len(filter_cols))):
+            options = cached(("distinct", col), lambda conn, col=col: distinct_values(conn, table, col))
+            with box:
+                filters[col] = st.multiselect(col.replace("_", " ").title(), options, key=f"{table}_f_{col}")
+
+    if not columns:
+        st.info("Select at least one column.")
+        return
+
+    filter_key = tuple((c, tuple(v)) for c, v in filters.items() if v)
+    total = cached(("count", filter_key), lambda conn: count_rows(conn, table, filters))
+    pages = max(1, math.ceil(total / page_size))
+    if st.session_state.get(f"{table}_page", 1) > pages:
+        st.session_state[f"{table}_page"] = pages  # filters shrank the result set
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1, key=f"{table}_page")
+    offset = (page - 1) * page_size
+
+    df = cached(
+        ("page", tuple(columns), filter_key, sort_col, descending, page_size, offset),
+        lambda conn: fetch_page(conn, table, columns, filters, sort_col, descending, page_size, offset),
+    )
+    st.dataframe(df, hide_index=True, width="stretch")
+    st.caption(f"Rows {offset + 1 if total else 0:,}–{offset + len(df):,} of {total:,}")
@@ -0,0 +1,41 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import schema
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test inside an empty temp directory (the modules use relative paths)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def write_tickets():
+    """Factory writing an it_tickets-shaped CSV with n random rows to path."""
+    def write(path, n=20_000, seed=0):
+        rng = np.random.default_rng(seed)
+        pd.DataFrame({
+            "ticket_id": np.arange(n),
+            "priority": rng.choice(["Low", "High"], n),
+            "description": "x",
+            "status": rng.choice(["Open", "Resolved", "Waiting for User"], n),
+            "assigned_to": rng.choice(["IT_Support_A", "IT_Support_B", "IT_Support_C"], n),
+            "created_at": "2024-01-01 00:00:00",
+            "resolution_time_hours": np.where(rng.random(n) < 0.05, np.nan, rng.lognormal(3, 1, n).round(1)),
+        }).to_csv(path, index=False)
+        return path
+    return write
+
+
+@pytest.fixture
+def db():
+    """An in-memory database migrated to the current schema (autocommit)."""
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    schema.migrate(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pandas as pd
+
+import analytics_engine
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_shards_merge_to_whole_file(tmp_path, write_tickets):
+    path = tmp_path / "it_tickets.csv"
+    write_tickets(path)
+    engine = analytics_engine.PartitionedAnalytics(workers=1, shard_bytes=64 << 10)
+    whole = analytics_engine.partial(pd.read_csv(path))
+    assert len(analytics_engine.shards(path, 64 << 10)) > 1
+    pd.testing.assert_frame_equal(engine.grouped(str(path)).sort_index(), whole.sort_index())
+
+
+def test_workers_from_unguarded_script(tmp_path, write_tickets):
+    # Streamlit runs pages as __main__ without a guard; workers must not re-run them
+    path = tmp_path / "it_tickets.csv"
+    write_tickets(path)
+    script = tmp_path / "page.py"
+    script.write_text(textwrap.dedent(f"""
+        import pandas as pd
+        import analytics_engine
+        print("page ran")
+        engine = analytics_engine.PartitionedAnalytics(workers=2, shard_bytes=64 << 10)
+        grouped = engine.grouped({str(path)!r})
+        expected = analytics_engine.partial(pd.read_csv({str(path)!r}))
+        assert engine.stats()["shards"] > 1 and engine.stats()["worker_processes"] == 2
+        pd.testing.assert_frame_equal(grouped.sort_index(), expected.sort_index())
+        engine.shutdown()
+        print("ok")
+    """))
+    env = dict(os.environ, PYTHONPATH=REPO)
+    out = subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, timeout=300)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["page", "ran", "ok"]
+
+
+def test_small_file_skips_partitioned_engine(workdir, write_tickets):
+    from operatios import TicketAnalytics
+
+    class NoWorkers:
+        shard_bytes = 1 << 20
+
+        def summarize(self, path):
+            raise AssertionError("a file under 2 * shard_bytes should be summarized in-process")
+
+    (workdir / "app" / "data").mkdir(parents=True)
+    path = write_tickets(workdir / "app" / "data" / "it_tickets.csv", n=2_000)
+    ta = TicketAnalytics(engine=NoWorkers())
+    assert ta.df is not None and ta.summary["total"] == 2_000
+    engine = analytics_engine.PartitionedAnalytics(workers=1, shard_bytes=os.path.getsize(path) // 3)
+    try:
+        ta = TicketAnalytics(engine=engine)
+        assert ta.df is None and ta.summary["total"] == 2_000
+    finally:
+        engine.shutdown()
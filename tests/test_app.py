@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def users_dir(workdir, monkeypatch):
+    monkeypatch.setattr(app, "BCRYPT_ROUNDS", 4)
+    return workdir
+
+
+def test_unterminated_last_line_is_loaded(users_dir):
+    (users_dir / "users.txt").write_text("alice,h1\nbob,h2")
+    assert app.load_users() == {"alice": "h1", "bob": "h2"}
+    assert app.LogUserStore().get("bob") == "h2"
+
+
+def test_append_after_unterminated_line_keeps_it(users_dir):
+    (users_dir / "users.txt").write_text("alice,h1\nbob,h2")
+    store = app.LogUserStore()
+    assert store.add("carol", "h3")
+    assert (users_dir / "users.txt").read_text() == "alice,h1\nbob,h2\ncarol,h3\n"
+    assert app.load_users() == {"alice": "h1", "bob": "h2", "carol": "h3"}
+    assert store.get("bob") == "h2" and store.get("carol") == "h3"
+
+
+def test_unterminated_line_without_newline_in_tail_window(users_dir):
+    long_hash = "x" * 10_000
+    (users_dir / "users.txt").write_text(f"alice,{long_hash}")
+    app.LogUserStore().set("bob", "h2")
+    assert app.load_users() == {"alice": long_hash, "bob": "h2"}
+
+
+def test_log_store_register_login_change(users_dir):
+    assert app.register_user("alice", "password1")
+    assert not app.register_user("alice", "password2")
+    assert app.login_user("alice", "password1")
+    assert app.change_password("alice", "password1", "password2")
+    assert app.login_user("alice", "password2") and not app.login_user("alice", "password1")
+
+
+def test_log_index_follows_outside_changes(users_dir):
+    store = app.LogUserStore()
+    store.add("alice", "h1")
+    with open("users.txt", "a") as f:  # appended by another tool
+        f.write("bob,h2\n")
+    assert app.LogUserStore().get("bob") == "h2"
+    (users_dir / "users.txt").write_text("bob,h9\nalice,h8\n")  # rewritten in place
+    store = app.LogUserStore()
+    assert store.get("alice") == "h8" and store.get("bob") == "h9"
+
+
+def test_log_compaction_keeps_latest(users_dir, monkeypatch):
+    monkeypatch.setattr(app, "COMPACT_MIN_LINES", 10)
+    store = app.LogUserStore()
+    for i in range(12):
+        store.set("alice", f"h{i}")
+    assert os.path.getsize("users.txt") < 12 * len("alice,h10\n")
+    assert app.LogUserStore().get("alice") == "h11"
+    assert app.load_users() == {"alice": "h11"}
+
+
+def test_open_user_store_is_reused(users_dir):
+    assert app.open_user_store() is app.open_user_store()
+    assert app.open_user_store("sqlite") is app.open_user_store("sqlite")
+
+
+def test_add_many_appends_without_rewrite(users_dir):
+    store = app.LogUserStore()
+    store.add("alice", "h1")
+    inode = os.stat("users.txt").st_ino
+    assert store.add_many([("bob", "h2"), ("alice", "h9"), ("carol", "h3"), ("bob", "h8")]) == 2
+    assert os.stat("users.txt").st_ino == inode
+    assert (users_dir / "users.txt").read_text() == "alice,h1\nbob,h2\ncarol,h3\n"
+    assert store.get("carol") == "h3" and app.LogUserStore().get("bob") == "h2"
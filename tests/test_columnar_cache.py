@@ -0,0 +1,22 @@
+import pandas as pd
+
+import columnar_cache
+
+
+def test_unencodable_frame_is_returned_uncached(tmp_path, monkeypatch):
+    path = tmp_path / "it_tickets.csv"
+    path.write_text("ticket_id\n1\nTICKET-2\n")
+    mixed = pd.DataFrame({"ticket_id": pd.Series([1, "TICKET-2"], dtype=object)})
+    monkeypatch.setattr(columnar_cache, "parse_typed", lambda p: mixed)
+    assert columnar_cache.read_csv_cached(path) is mixed
+    assert not columnar_cache.is_fresh(path)
+
+
+def test_damaged_cache_is_rebuilt(tmp_path, write_tickets):
+    path = write_tickets(tmp_path / "it_tickets.csv", n=100)
+    first = columnar_cache.read_csv_cached(path)
+    assert columnar_cache.is_fresh(path)
+    _, feather_path, _ = columnar_cache._cache_paths(path)
+    with open(feather_path, "r+b") as f:
+        f.truncate(64)
+    pd.testing.assert_frame_equal(columnar_cache.read_csv_cached(path), first)
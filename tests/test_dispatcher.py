@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import dispatcher
+from dispatcher import CircuitBreaker, CircuitOpen, Dispatcher, ProviderFailed
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def failing(status_code):
+    def fn():
+        raise StatusError(status_code)
+    return fn
+
+
+@pytest.fixture
+def mock_dispatcher(monkeypatch):
+    monkeypatch.setattr(dispatcher, "MAX_RETRIES", 0)
+    return Dispatcher({"mock": {"rate_limits": [(1000.0, 1000)], "concurrency": 4,
+                                "failure_threshold": 2, "reset_after_s": 60.0}})
+
+
+def test_client_errors_do_not_open_circuit(mock_dispatcher):
+    for _ in range(5):
+        with pytest.raises(ProviderFailed) as info:
+            mock_dispatcher.call("mock", failing(400), timeout=10)
+        assert isinstance(info.value.__cause__, StatusError)
+    assert mock_dispatcher.stats()["mock"]["circuit"] == "closed"
+    assert mock_dispatcher.call("mock", lambda: "ok", timeout=10) == "ok"
+
+
+def test_provider_errors_open_circuit(mock_dispatcher):
+    for _ in range(2):
+        with pytest.raises(ProviderFailed):
+            mock_dispatcher.call("mock", failing(503), timeout=10)
+    with pytest.raises(CircuitOpen):
+        mock_dispatcher.call("mock", lambda: "ok", timeout=10)
+
+
+def test_stream_failure_is_provider_failed(mock_dispatcher):
+    def broken():
+        yield "a"
+        raise ConnectionError("reset")
+    with pytest.raises(ProviderFailed):
+        list(mock_dispatcher.stream("mock", broken))
+
+
+def test_half_open_admits_one_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_after_s=0.05)
+    breaker.record(False)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    time.sleep(0.06)
+    assert breaker.check() is True
+    with pytest.raises(CircuitOpen):
+        breaker.check()  # the probe is still in flight
+    breaker.release(True)  # probe ended with a client error
+    assert breaker.check() is True
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.check() is False
+
+
+def test_stream_followers_time_out_with_the_leader(mock_dispatcher):
+    release = threading.Event()
+
+    def stalled():
+        yield "a"
+        release.wait(5)
+        yield "b"
+
+    leader = mock_dispatcher.stream("mock", stalled, key="q", timeout=0.1)
+    follower = mock_dispatcher.stream("mock", lambda: iter(["never opened"]), key="q", timeout=None)
+    try:
+        for stream in (leader, follower):
+            assert next(stream) == "a"
+            with pytest.raises(ProviderFailed):
+                next(stream)
+    finally:
+        release.set()
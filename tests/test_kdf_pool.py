@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+import kdf_pool
+from kdf_pool import KDFBusy, KDFPool
+
+
+def test_slow_result_raises_kdf_busy(monkeypatch):
+    monkeypatch.setattr(kdf_pool, "RESULT_TIMEOUT", 0.05)
+    pool = KDFPool(workers=1, max_pending=4)
+    release = threading.Event()
+    blocker = pool.submit(release.wait, 5)  # occupies the only worker
+    try:
+        with pytest.raises(KDFBusy):
+            pool.verify("password1", "$2b$04$" + "a" * 53)
+    finally:
+        release.set()
+    blocker.result(timeout=5)
+    stats = pool.stats()
+    assert stats["timed_out"] == 1 and stats["queued"] == 0 and stats["running"] == 0
+    gate = threading.Event()
+    held = [pool.submit(gate.wait, 5) for _ in range(4)]  # the timed-out request gave its slot back
+    gate.set()
+    assert all(f.result(timeout=5) for f in held)
+    pool.shutdown()
+
+
+def test_full_pool_raises_kdf_busy():
+    pool = KDFPool(workers=1, max_pending=1)
+    release = threading.Event()
+    pool.submit(release.wait, 5)
+    with pytest.raises(KDFBusy):
+        pool.submit(lambda: None)
+    release.set()
+    pool.shutdown()
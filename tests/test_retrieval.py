@@ -0,0 +1,44 @@
+import sqlite3
+
+import changefeed
+import retrieval
+import schema
+
+
+def test_sync_indexes_new_rows_and_is_throttled():
+    conn = sqlite3.connect(":memory:")
+    for table in retrieval.TABLES:
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, description TEXT)")
+    conn.execute("INSERT INTO it_tickets (description) VALUES ('printer jammed on floor two')")
+    index = retrieval.RetrievalIndex()
+    assert index.sync(conn) == 1 and [h[2] for h in index.search("printer")] == [1]
+
+    conn.execute("INSERT INTO cyber_incidents (description) VALUES ('phishing mail with printer invoice')")
+    assert index.sync(conn) == 0  # throttled
+    assert index.sync(conn, force=True) == 1
+    assert sorted(h[1] for h in index.search("printer")) == ["cyber_incidents", "it_tickets"]
+    assert index.search("vpn") == [] and len(index) == 2
+
+
+def test_sync_follows_updates_deletes_and_reloads(db):
+    for table in changefeed.WATCHED:
+        changefeed.ensure_changelog(db, table)
+    schema.insert(db, "it_tickets", [{"ticket_id": "T1", "description": "printer jammed on floor two"},
+                                     {"ticket_id": "T2", "description": "vpn keeps dropping"}])
+    index = retrieval.RetrievalIndex()
+    assert index.sync(db) == 2 and [h[2] for h in index.search("printer")] == [1]
+    db.execute("COMMIT")
+
+    db.execute("UPDATE it_tickets SET description = 'scanner broken' WHERE ticket_id = 'T1'")
+    db.execute("DELETE FROM it_tickets WHERE ticket_id = 'T2'")
+    assert index.sync(db) == 0  # throttled
+    index.sync(db, force=True)
+    assert index.search("printer") == [] and index.search("vpn") == []
+    assert [h[2] for h in index.search("scanner")] == [1] and len(index) == 1
+    db.execute("COMMIT")
+
+    with changefeed.bulk(db, "it_tickets", full=True):
+        db.execute("DELETE FROM it_tickets")
+        schema.insert(db, "it_tickets", [{"ticket_id": "T3", "description": "vpn down"}])
+    index.sync(db, force=True)
+    assert [h[2] for h in index.search("vpn")] == [3] and index.search("scanner") == [] and len(index) == 1
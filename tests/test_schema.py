@@ -0,0 +1,39 @@
+import sqlite3
+
+import pandas as pd
+import pyarrow as pa
+
+import schema
+from data import DatabaseManager
+
+
+def test_csv_and_form_ids_share_a_text_column(db):
+    schema.insert(db, "it_tickets", pd.DataFrame({"ticket_id": [1001, 1002], "priority": ["Low", "High"]}))
+    schema.insert(db, "it_tickets", [{"ticket_id": "TICKET-20240101-120000", "priority": "Low", "title": "VPN"}])
+    assert {r[0] for r in db.execute("SELECT typeof(ticket_id) FROM it_tickets")} == {"text"}
+    df = pd.read_sql_query(f"SELECT * FROM {schema.view('it_tickets')}", db)
+    assert df["ticket_id"].tolist() == ["1001", "1002", "TICKET-20240101-120000"]
+    pa.Table.from_pandas(df)  # what st.dataframe does; mixed int / str columns fail here
+
+
+def test_v1_tables_migrate_with_new_columns_empty():
+    conn = sqlite3.connect(":memory:")
+    schema._v1_baseline(conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("INSERT INTO it_tickets (ticket_id, priority, status, created_at) VALUES (7, 'High', 'Open', '2024-01-02 03:04:05')")
+    assert schema.migrate(conn) == schema.SCHEMA_VERSION
+    row = pd.read_sql_query(f"SELECT * FROM {schema.view('it_tickets')}", conn).iloc[0]
+    assert (row["ticket_id"], row["priority"], row["created_at"]) == ("7", "High", "2024-01-02 03:04:05")
+    assert row[["title", "resolved_date", "current_stage"]].isna().all()
+
+
+def test_sample_data_keeps_every_field(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "platform.db"))
+    manager.load_sample_data()
+    incident = manager.fetch_cyber_incidents().set_index("title").loc["Malware Detection - Server A"]
+    assert (incident["resolved_date"], incident["resolution_time_hours"]) == ("2024-01-12", 48)
+    ticket = manager.fetch_it_tickets().set_index("title").loc["Software Installation"]
+    assert (ticket["status"], ticket["current_stage"], ticket["assigned_to"]) == ("Open", "Waiting for User", "Mike Brown")
+    dataset = manager.fetch_datasets().set_index("name").loc["Security Events"]
+    assert (dataset["source_department"], dataset["size_mb"], dataset["quality_score"], dataset["last_accessed"],
+            dataset["rows"]) == ("Cybersecurity", 150.2, 0.92, "2024-01-14", 500000)
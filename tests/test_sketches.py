@@ -0,0 +1,53 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import rollups
+import schema
+import sketches
+
+
+def sql_buckets(values):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE x (i INTEGER PRIMARY KEY, v)")  # no affinity: values keep their type
+    conn.executemany("INSERT INTO x (v) VALUES (?)", [(v,) for v in values])
+    return [r[0] for r in conn.execute(f"SELECT {sketches.bucket_sql('v')} FROM x ORDER BY i")]
+
+
+def test_bucket_sql_matches_bucket():
+    values = [None, "", "abc", -0.5, -3, 0, 0.01, 1.99, 2, 127.9, 128, 1000.5, 2 ** 33, 2 ** 40, float(2 ** 34) - 1]
+    values += list(np.linspace(0, 5000, 2001)) + list(range(0, 3000, 7))
+    py = sketches.bucket(pd.Series(values, dtype=object)).tolist()
+    for value, s, p in zip(values, sql_buckets(values), py):
+        assert (s is None and pd.isna(p)) or s == p, value
+
+
+@pytest.mark.parametrize("sigma", [0.5, 1.2])
+@pytest.mark.parametrize("mu", [0.0, 1.0, 3.0])
+def test_quantiles_close_to_exact(mu, sigma):
+    v = pd.Series(np.random.default_rng(0).lognormal(mu, sigma, 100_000))
+    got = sketches.quantiles(sketches.bucket(v).value_counts())
+    for name, q in sketches.QUANTILES.items():
+        exact = np.quantile(v, q, method="inverted_cdf")
+        assert abs(got[name] - exact) <= max(0.008 * exact, 1 / 128), (name, got[name], exact)
+
+
+def test_rollup_matches_recompute(db):
+    conn = db
+    rng = np.random.default_rng(1)
+    n = 2000
+    schema.insert(conn, "it_tickets", pd.DataFrame({
+        "ticket_id": np.arange(n), "priority": "Low", "description": "x",
+        "status": rng.choice(["Open", "Resolved"], n), "assigned_to": rng.choice(["A", "B", "C"], n),
+        "created_at": "2024-01-01 00:00:00", "resolution_time_hours": rng.lognormal(2, 1, n).round().astype(int),
+    }))
+    rollups.ensure_rollups(conn, "it_tickets")
+    conn.execute("UPDATE it_tickets SET resolution_time_hours = resolution_time_hours * 3 WHERE id % 5 = 0")
+    conn.execute("DELETE FROM it_tickets WHERE id % 7 = 0")
+    df = pd.read_sql_query(f"SELECT assigned_to, resolution_time_hours AS v FROM {schema.view('it_tickets')}", conn)
+    counts = df.assign(bucket=sketches.bucket(df["v"])).groupby(["assigned_to", "bucket"]).size()
+    expected = sketches.percentile_table(counts, "assigned_to")
+    got = rollups.percentiles(conn, "it_tickets", "assigned_to")
+    pd.testing.assert_frame_equal(got.sort_index(), expected.sort_index())
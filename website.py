@@ -1,10 +1,25 @@
 import streamlit as st
 import pandas as pd
-import bcrypt
-import sqlite3
 from datetime import datetime
-from openai import OpenAI
 import os
+import startup
+import ingest
+import aggregates
+from db_pool import get_pool
+from table_cache import TableCache
+from table_view import paginated_table
+from search import ensure_fts, search_box
+import rollups
+import schema
+import changefeed
+import frames
+from kdf_pool import KDFPool, KDFBusy
+from llm_stream import stream_chat, FakeChatClient
+from response_cache import ResponseCache, make_key
+from context_window import fit_window
+from retrieval import RetrievalIndex, context_for
+from dispatcher import Dispatcher, RateLimited, CircuitOpen, ProviderFailed
+from write_queue import WriteBehindQueue
 
 # ====================== PAGE & LOGO ======================
 st.set_page_config(page_title="Intelligence Platform", layout="wide", page_icon="Chart")
@@ -21,61 +36,106 @@ with st.sidebar:
     ], index=0)
 
 DATA_FOLDER = "DATA"
+DB_FILE = "intelligence_platform.db"
+WRITE_JOURNAL = "intelligence_platform.journal"
+LIVE_REFRESH_S = 5  # how often live dashboard sections poll the change feed
+INCIDENT_DIMS = ("severity", "category", "status")
+TICKET_DIMS = ("priority", "status", "assigned_to")
 
 # ====================== DATABASE ======================
+@st.cache_resource
+def pool():
+    # one pool per server process, shared by every session
+    return get_pool(DB_FILE)
+
+@st.cache_resource
+def table_cache():
+    # shared read cache; writers bump the table version after committing
+    return TableCache()
+
 def init_db():
-    with sqlite3.connect('intelligence_platform.db', timeout=30) as conn:
-        c = conn.cursor()
-        c.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password_hash TEXT)')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS cyber_incidents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT, timestamp TEXT, severity TEXT,
-                category TEXT, status TEXT, description TEXT
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS datasets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                dataset_id INTEGER, name TEXT, rows INTEGER,
-                columns INTEGER, uploaded_by TEXT, upload_date TEXT
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS it_tickets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticket_id INTEGER, priority TEXT, description TEXT,
-                status TEXT, assigned_to TEXT, created_at TEXT,
-                resolution_time_hours INTEGER
-            )
-        ''')
+    with pool().connection() as conn:
+        # typed tables, lookup tables and indexes (PRAGMA user_version migrations)
+        schema.migrate(conn)
+        # full-text search over descriptions, kept in sync by triggers
+        ensure_fts(conn, "cyber_incidents")
+        ensure_fts(conn, "it_tickets")
+        # hourly / daily trend rollups, kept current by triggers
+        rollups.ensure_rollups(conn, "cyber_incidents")
+        rollups.ensure_rollups(conn, "it_tickets")
+        # changelog for the live dashboard sections
+        for table in changefeed.WATCHED:
+            changefeed.ensure_changelog(conn, table)
 
 init_db()
 
 # ====================== PASSWORD & OPENAI ======================
-def hash_pw(pw): return bcrypt.hashpw(pw.encode(), bcrypt.gensalt()).decode()
-def check_pw(pw, h): return bcrypt.checkpw(pw.encode(), h.encode())
+@st.cache_resource
+def kdf_pool():
+    # bcrypt runs on a bounded worker pool shared by all sessions
+    return KDFPool()
+
+def hash_pw(pw): return kdf_pool().hash(pw)
+def check_pw(pw, h): return kdf_pool().verify(pw, h)
+
+@st.cache_resource
+def openai_client():
+    # built (and the SDK imported) the first time the AI page is opened;
+    # failures aren't cached, so a key added later is picked up
+    if os.getenv("OPENAI_FAKE"):
+        return FakeChatClient()  # offline stub for demos and benchmarks
+    OpenAI = startup.timed_import("openai").OpenAI
+    return OpenAI(api_key=st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY"))
+
+@st.cache_resource
+def response_cache():
+    # replies shared across sessions; disk tier in ai_cache.db
+    return ResponseCache()
+
+@st.cache_resource
+def retrieval_index():
+    # BM25 index over incident / ticket descriptions, grown incrementally
+    return RetrievalIndex()
+
+@st.cache_resource
+def dispatcher():
+    # one event loop for all model requests: rate limits, retries, dedup
+    return Dispatcher()
 
-try:
-    client = OpenAI(api_key=st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY"))
-    AI_READY = True
-except:
-    AI_READY = False
+@st.cache_resource
+def write_queue():
+    # form submissions: acknowledged at once, group-committed by one writer thread,
+    # journaled so a restart replays anything not yet committed
+    cache, index = table_cache(), retrieval_index()
+
+    def committed(tables):
+        cache.bump(*tables)
+        if tables & {"cyber_incidents", "it_tickets"}:
+            # new rows are searchable as soon as they commit (reads only the changelog tail and new rows)
+            with pool().connection() as conn:
+                index.sync(conn, force=True)
+    return WriteBehindQueue(pool(), WRITE_JOURNAL, on_commit=committed)
+
+@st.cache_resource
+def live_feed(table, dims):
+    # running counts fed by the changelog, shared by every open dashboard
+    return changefeed.LiveFeed(pool(), table, dims)
 
 # ====================== DATABASE CLASS ======================
 class DB:
     @staticmethod
     def add_user(u, p):
+        h = hash_pw(p)  # KDFBusy propagates to the caller
         try:
-            with sqlite3.connect('intelligence_platform.db') as conn:
+            with pool().connection() as conn:
                 c = conn.cursor()
-                c.execute("INSERT INTO users (username,password_hash) VALUES (?,?)", (u, hash_pw(p)))
+                c.execute("INSERT INTO users (username,password_hash) VALUES (?,?)", (u, h))
             return True
         except: return False
 
     @staticmethod
     def login(u, p):
-        with sqlite3.connect('intelligence_platform.db') as conn:
+        with pool().connection() as conn:
             c = conn.cursor()
             c.execute("SELECT password_hash FROM users WHERE username=?", (u,)) 
             r = c.fetchone()
@@ -83,71 +143,98 @@ class DB:
 
     @staticmethod
     def save_incident(data):
-        with sqlite3.connect('intelligence_platform.db') as conn:
-            c = conn.cursor()
-            c.execute("""INSERT INTO cyber_incidents 
-                      (incident_id, timestamp, severity, category, status, description)
- VALUES (?,?,?,?,?,?)""",
-                      (data['id'], data['time'], data['severity'], data['category'], "Open", data['desc']))
+        # queued; the writer commits it, bumps the cache and indexes it
+        return write_queue().submit("cyber_incidents", {
+            'incident_id': data['id'], 'timestamp': data['time'], 'severity': data['severity'],
+            'category': data['category'], 'status': "Open", 'description': data['desc'],
+        })
 
     @staticmethod
     def save_dataset(data):
-        with sqlite3.connect('intelligence_platform.db') as conn:
-            c = conn.cursor()
-            c.execute("""INSERT INTO datasets 
- (dataset_id, name, rows, columns, uploaded_by, upload_date)
- VALUES (?,?,?,?,?,?)""",
-                      (data['id'], data['name'], data['rows'], data['cols'], data['by'], data['date']))
+        return write_queue().submit("datasets", {
+            'dataset_id': data['id'], 'name': data['name'], 'rows': data['rows'],
+            'columns': data['cols'], 'uploaded_by': data['by'], 'upload_date': data['date'],
+        })
 
     @staticmethod
     def save_ticket(data):
-        with sqlite3.connect('intelligence_platform.db') as conn:
-            c = conn.cursor()
-            c.execute("""INSERT INTO it_tickets 
- (ticket_id, priority, description, status, assigned_to, created_at)
- VALUES (?,?,?,?,?,?)""",
-                      (data['id'], data['priority'], data['desc'], "Open", data['to'], data['time']))
+        return write_queue().submit("it_tickets", {
+            'ticket_id': data['id'], 'priority': data['priority'], 'description': data['desc'],
+            'status': "Open", 'assigned_to': data['to'], 'created_at': data['time'], 'title': data['title'],
+        })
 
     @staticmethod
     def load_data():
-        with sqlite3.connect('intelligence_platform.db', timeout=30) as conn:
-            c = conn.cursor()
-            for t in ["cyber_incidents", "datasets", "it_tickets"]:
-                c.execute(f"DELETE FROM {t}")
-
-            # FIXED: Now unpacks correctly (2 items: query and cols)
-            files = {
-                "cyber_incidents.csv": (
-                    "INSERT INTO cyber_incidents VALUES (NULL,?,?,?,?,?,?)",
-                    ['incident_id','timestamp','severity','category','status','description']
-                ),
-                "datasets_metadata.csv": (
-                    "INSERT INTO datasets VALUES (NULL,?,?,?,?,?,?)",
-                    ['dataset_id','name','rows','columns','uploaded_by','upload_date']
-                ),
-                "it_tickets.csv": (
-                    "INSERT INTO it_tickets VALUES (NULL,?,?,?,?,?,?,?)",
-                    ['ticket_id','priority','description','status','assigned_to','created_at','resolution_time_hours']
-                )
-            }
-
-            for filename, data in files.items():
-                query, cols = data  # Now correctly unpacks 2 values
-                path = os.path.join(DATA_FOLDER, filename)
-                try:
-                    df = pd.read_csv(path, sep=',', on_bad_lines='skip', dtype=str)
-                    df.columns = df.columns.str.strip()
-                    for _, r in df.iterrows():
-                        values = [r.get(col, "") for col in cols]
-                        c.execute(query, values)
-                    st.sidebar.success(f"Loaded {len(df)} ← {filename}")
-                except Exception as e:
-                    st.sidebar.error(f"{filename}: {e}")
+        with pool().connection() as conn:
+            results = ingest.load_sources(conn, DATA_FOLDER)
+        table_cache().bump(*[ingest.SOURCES[r["source"]][0] for r in results if r["mode"] != "skipped"])
+
+        for r in results:
+            if r["error"]:
+                st.sidebar.error(f"{r['source']}: {r['error']}")
+            elif r["mode"] == "skipped":
+                st.sidebar.info(f"Unchanged ← {r['source']}")
+            else:
+                st.sidebar.success(f"Loaded {r['rows']:,} ← {r['source']} ({r['rows_per_sec']:,.0f} rows/s)")
 
     @staticmethod
     def get(table):
-        with sqlite3.connect('intelligence_platform.db') as conn:
-            return pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        # compact typed frame (categoricals, datetimes, downcast ints), one copy shared by
+        # every session until the next write to this table; don't mutate the result
+        def read():
+            with pool().connection() as conn:
+                return frames.load(conn, table)
+        return table_cache().get(table, "typed", read)
+
+    @staticmethod
+    def aggregate(table, fn, *args):
+        # fn is one of the aggregates.* functions; the small result is cached per table version
+        def run():
+            with pool().connection() as conn:
+                return fn(conn, table, *args)
+        return table_cache().get(table, (fn.__name__, *args), run)
+
+def trend_chart(table, label, dims):
+    # reads only the rollup tables, cached per table version
+    c1, c2 = st.columns(2)
+    with c1:
+        grain = st.selectbox(f"{label} per", ["day", "week", "hour"], key=f"{table}_trend_grain")
+    with c2:
+        dim = st.selectbox("Split by", dims, key=f"{table}_trend_dim")
+    st.area_chart(DB.aggregate(table, rollups.trend, grain, dim))
+
+def percentile_chart(table, label, dims):
+    # merges the per-cell resolution sketches in the rollup table, cached per table version
+    st.subheader(f"{label} percentiles")
+    dim = st.selectbox("Per", dims, key=f"{table}_pct_dim")
+    pct = DB.aggregate(table, rollups.percentiles, dim)
+    if pct.empty:
+        st.info("No resolution times recorded yet.")
+        return
+    st.bar_chart(pct[["p50", "p90", "p99"]], stack=False)
+    st.dataframe(pct, column_config={q: st.column_config.NumberColumn(format="%.1f h") for q in ("p50", "p90", "p99")})
+
+def live_section(table, dims, render):
+    # reruns on its own every LIVE_REFRESH_S while live updates are on; only the
+    # changelog past the feed's high-water mark (and the rows it names) is read
+    @st.fragment(run_every=LIVE_REFRESH_S if st.session_state.get("live_updates") else None)
+    def section():
+        feed = live_feed(table, dims)
+        if feed.poll():
+            table_cache().bump(table)  # rows may come from other processes too
+        render(feed)
+        arrivals = feed.arrivals()
+        if len(arrivals):
+            st.bar_chart(arrivals, height=120)
+        with st.expander("Latest"):
+            st.dataframe(feed.latest(), hide_index=True)
+    section()
+
+def seen_delta(key, value):
+    # change since this session last rendered the metric
+    prev = st.session_state.get(key, value)
+    st.session_state[key] = value
+    return value - prev or None
 
 # Load data
 if "data_loaded" not in st.session_state:
@@ -167,26 +254,50 @@ if not st.session_state.logged_in:
         u = st.text_input("Username", key="login_username")
         p = st.text_input("Password", type="password", key="login_password")
         if st.button("Login", type="primary"):
-            if DB.login(u, p):
-                st.session_state.logged_in = True
-                st.session_state.user = u
-                st.rerun()
+            try:
+                ok = DB.login(u, p)
+            except KDFBusy:
+                st.warning("Server busy, please try again in a moment")
             else:
-                st.error("Wrong username/password")
+                if ok:
+                    st.session_state.logged_in = True
+                    st.session_state.user = u
+                    st.rerun()
+                else:
+                    st.error("Wrong username/password")
     with c2:
         st.header("Register")
         nu = st.text_input("New Username", key="reg_username")
         np = st.text_input("New Password", type="password", key="reg_password")
         if st.button("Register"):
-            if DB.add_user(nu, np):
-                st.success("Account created!")
+            try:
+                created = DB.add_user(nu, np)
+            except KDFBusy:
+                st.warning("Server busy, please try again in a moment")
             else:
-                st.error("Username taken")
+                if created:
+                    st.success("Account created!")
+                else:
+                    st.error("Username taken")
 else:
     st.sidebar.success(f"Logged in as: {st.session_state.user}")
     if st.sidebar.button("Logout"):
         st.session_state.clear()
         st.rerun()
+    st.sidebar.toggle("Live updates", key="live_updates", help=f"Refresh the dashboard figures every {LIVE_REFRESH_S}s")
+    with st.sidebar.expander("Frame memory"):
+        # estimated from a sample; cached per table version
+        for table in schema.TABLES:
+            report = DB.aggregate(table, frames.memory_report)
+            total = report.loc["total"]
+            st.caption(f"{table}: {total['bytes_before'] / 2**20:,.1f} MiB → {total['bytes_after'] / 2**20:,.1f} MiB")
+            st.dataframe(report)
+    with st.sidebar.expander("Database stats"):
+        st.json({"pool": pool().stats(), "read_cache": table_cache().stats(), "password_pool": kdf_pool().stats(),
+                 "ai_dispatcher": dispatcher().stats(), "write_queue": write_queue().stats(),
+                 "live_feeds": {f.table: f.stats() for f in [live_feed("cyber_incidents", INCIDENT_DIMS),
+                                                              live_feed("it_tickets", TICKET_DIMS)]},
+                 "import_ms": startup.report()})
 
     # ====================== MAIN PAGES ======================
     if page == "Cybersecurity":
@@ -214,10 +325,14 @@ else:
                     st.success("Incident saved!")
                     st.rerun()
 
-        df = DB.get("cyber_incidents")
-        st.metric("Total Incidents", len(df))
-        st.bar_chart(df["severity"].value_counts())
-        st.dataframe(df)
+        def incidents_live(feed):
+            total = feed.total()
+            st.metric("Total Incidents", total, delta=seen_delta("incidents_seen", total))
+            st.bar_chart(feed.counts("severity"))
+        live_section("cyber_incidents", INCIDENT_DIMS, incidents_live)
+        trend_chart("cyber_incidents", "Incidents", ["severity", "category"])
+        search_box(pool(), table_cache(), "cyber_incidents", "Search incidents")
+        paginated_table(pool(), table_cache(), "cyber_incidents", ["severity", "category", "status"])
 
     elif page == "Data Science":
         st.header("Data Science & ML Datasets Repository")
@@ -244,9 +359,8 @@ else:
                     st.success("Dataset saved!")
                     st.rerun()
 
-        df = DB.get("datasets")
-        st.metric("Total Rows", f"{pd.to_numeric(df['rows'], errors='coerce').sum():,}")
-        st.dataframe(df)
+        st.metric("Total Rows", f"{DB.aggregate('datasets', aggregates.total, 'rows'):,}")
+        paginated_table(pool(), table_cache(), "datasets", ["uploaded_by"])
 
     elif page == "IT Operations":
         st.header("IT Service Desk & Operations")
@@ -264,6 +378,7 @@ else:
                 if st.form_submit_button("Create Ticket", type="primary"):
                     DB.save_ticket({
                         'id': ticket_id,
+                        'title': title,
                         'priority': priority,
                         'desc': description,
                         'to': assigned_to,
@@ -272,19 +387,32 @@ else:
                     st.success("Ticket created and saved!")
                     st.rerun()
 
-        df = DB.get("it_tickets")
-        open_count = len(df[df['status'].str.contains('Open|Progress|Waiting', case=False, na=False)])
-        st.metric("Open Tickets", open_count)
-        st.bar_chart(df["priority"].value_counts())
-        st.dataframe(df)
+        def tickets_live(feed):
+            open_count = feed.matching("status", "Open|Progress|Waiting")
+            st.metric("Open Tickets", open_count, delta=seen_delta("open_tickets_seen", open_count), delta_color="inverse")
+            st.bar_chart(feed.counts("priority"))
+        live_section("it_tickets", TICKET_DIMS, tickets_live)
+        trend_chart("it_tickets", "Tickets", ["priority", "status"])
+        percentile_chart("it_tickets", "Resolution time", ["assigned_to", "status"])
+        search_box(pool(), table_cache(), "it_tickets", "Search tickets")
+        paginated_table(pool(), table_cache(), "it_tickets", ["priority", "status", "assigned_to"])
 
     elif page == "AI Assistant":
         st.header("AI Assistant")
         
         domain = st.selectbox("Select Domain", ["Cybersecurity", "Data Science", "IT Operations", "General"], key="ai_domain")
         
-        if AI_READY:
+        try:
+            client = openai_client()
+        except Exception:
+            client = None
+        if client is not None:
             st.success("Connected to OpenAI gpt-4o")
+            cache_stats = response_cache().stats()
+            st.sidebar.metric("Messages in Chat", len([m for m in st.session_state.get("messages", []) if m["role"] == "user"]))
+            st.sidebar.metric("Cache Hit Ratio", f"{cache_stats['hit_ratio']:.0%}")
+            st.sidebar.metric("Latency Saved", f"{cache_stats['saved_ms'] / 1000:.1f} s")
+            st.sidebar.metric("Prompt Tokens (last)", st.session_state.get("prompt_tokens", 0))
             
             if "messages" not in st.session_state:
                 st.session_state.messages = [{"role": "system", "content": f"You are an expert in {domain}."}]
@@ -302,12 +430,43 @@ else:
                         st.session_state.messages.append({"role": "user", "content": prompt})
                         with st.chat_message("user"):
                             st.markdown(prompt)
+                        msgs = st.session_state.messages
+                        records = context_for(retrieval_index(), pool(), prompt)
+                        key = make_key("gpt-4o", msgs[0]["content"] + records, [(m["role"], m["content"]) for m in msgs[1:]])
                         with st.chat_message("assistant"):
-                            with st.spinner("Thinking..."):
-                                resp = client.chat.completions.create(model="gpt-4o", messages=st.session_state.messages)
-                                reply = resp.choices[0].message.content
+                            reply = response_cache().get(key)
+                            if reply is not None:
                                 st.markdown(reply)
-                                st.session_state.messages.append({"role": "assistant", "content": reply})
+                                st.caption("Answered from cache")
+                            else:
+                                placeholder = st.empty()
+                                reply = ""
+                                stats = {}
+                                # send a token-budgeted window; older turns are folded into a summary
+                                summary, kept, ctx = fit_window(msgs[0]["content"] + records, [(m["role"], m["content"]) for m in msgs[1:]])
+                                request = [msgs[0]] + ([{"role": "system", "content": records}] if records else [])
+                                request += [{"role": "system", "content": summary}] if summary else []
+                                request += [{"role": role, "content": text} for role, text in kept]
+                                st.session_state.prompt_tokens = ctx["prompt_tokens"]
+                                try:
+                                    for delta in stream_chat(client, "gpt-4o", request, stats, dispatcher(), key):
+                                        reply += delta
+                                        placeholder.markdown(reply + "▌")
+                                except (RateLimited, CircuitOpen) as e:
+                                    st.session_state.messages.pop()
+                                    st.error(f"AI service busy: {e}")
+                                    st.stop()
+                                except ProviderFailed as e:
+                                    st.session_state.messages.pop()
+                                    st.error(f"AI request failed: {e}")
+                                    st.stop()
+                                placeholder.markdown(reply)
+                                response_cache().put(key, reply, stats["total_ms"])
+                                st.session_state.setdefault("ai_stats", []).append(stats)
+                                st.caption(f"First token {stats['ttft_ms']:.0f} ms · {stats['tokens']} tokens · {stats['tokens_per_s']:.1f} tok/s"
+                                           f" · prompt ≈ {ctx['prompt_tokens']} tokens"
+                                           + (f" ({ctx['summarized_turns']} earlier turns summarized)" if ctx["summarized_turns"] else ""))
+                            st.session_state.messages.append({"role": "assistant", "content": reply})
         else:
             st.warning("OpenAI key not found")
 
@@ -0,0 +1,227 @@
+# write_queue.py
+"""
+Write-behind queue for the dashboard's form submissions
+- submit() appends the row to a journal file (flushed and fsynced), queues
+  it and returns at once with a sequence number; the page never waits on
+  SQLite's write lock
+- one writer thread drains the queue in batches (up to max_batch rows, or
+  whatever arrived within max_delay of the first) and inserts each batch
+  in a single transaction (group commit)
+- the highest applied sequence number is stored in the same transaction,
+  so after a crash the journal is replayed from there exactly once; the
+  journal is truncated whenever everything in it has been applied, and
+  compacted to the pending entries on start
+- a failing batch is retried with backoff; after RETRIES_BEFORE_SPLIT
+  attempts its rows are applied one at a time and a row that still fails
+  is moved to <journal>.rejected instead of blocking the queue
+- on_commit(tables) runs after each commit (cache invalidation, indexing)
+- stats() reports queue depth, batch sizes, commit latency and failures
+Queued rows become visible to readers once their batch commits (normally
+within milliseconds).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import schema
+
+MAX_BATCH = 500
+MAX_DELAY_S = 0.02  # how long the writer waits to grow a batch after the first row
+RETRIES_BEFORE_SPLIT = 3
+BACKOFF_S, BACKOFF_CAP_S = 0.5, 10
+LATENCY_WINDOW = 500  # recent commits kept for the percentiles
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class WriteBehindQueue:
+    def __init__(self, pool, journal_path, on_commit=None, max_batch=MAX_BATCH, max_delay=MAX_DELAY_S):
+        self.pool = pool
+        self.journal_path = journal_path
+        self.on_commit = on_commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()  # journal appends + sequence numbers
+        self._applied = threading.Condition(threading.Lock())
+        self._commit_ms = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"submitted": 0, "committed": 0, "rejected": 0, "batches": 0, "max_batch": 0,
+                       "retries": 0, "replayed": 0, "ack_s": 0.0, "last_error": None}
+
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS write_queue_state (id INTEGER PRIMARY KEY CHECK (id = 1), applied_seq INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO write_queue_state VALUES (1, 0)")
+            self._applied_seq = conn.execute("SELECT applied_seq FROM write_queue_state").fetchone()[0]
+        pending = [e for e in self._read_journal() if e["seq"] > self._applied_seq]
+        self._last_seq = max([self._applied_seq] + [e["seq"] for e in pending])
+        # rewrite the journal with just the pending entries (drops applied ones and a torn tail)
+        with open(journal_path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, default=str) + "\n" for e in pending)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(journal_path + ".tmp", journal_path)
+        for e in pending:
+            self._queue.put(e)
+        self._stats["replayed"] = len(pending)
+        self._journal = open(journal_path, "a", encoding="utf-8")
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-append: never acknowledged
+
+    # ---------- producers ----------
+    def submit(self, table, row) -> int:
+        """Journal and queue one row ({column: value}) for table. Returns its sequence number."""
+        if table not in schema.TABLES:
+            raise ValueError(f"unknown table {table!r}")
+        t0 = time.perf_counter()
+        with self._lock:
+            seq = self._last_seq + 1
+            entry = {"seq": seq, "table": table, "row": row}
+            self._journal.write(json.dumps(entry, default=str) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._last_seq = seq
+            self._queue.put(entry)
+            self._stats["submitted"] += 1
+            self._stats["ack_s"] += time.perf_counter() - t0
+        return seq
+
+    def wait(self, seq, timeout=None) -> bool:
+        """Block until seq is committed (or rejected). Returns False on timeout."""
+        with self._applied:
+            return self._applied.wait_for(lambda: self._applied_seq >= seq, timeout)
+
+    def flush(self, timeout=None) -> bool:
+        """Block until everything submitted so far is committed."""
+        with self._lock:
+            seq = self._last_seq
+        return self.wait(seq, timeout)
+
+    # ---------- writer ----------
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(0, remaining)) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _apply(self, entries):
+        """Insert entries and advance applied_seq in one transaction. Returns the tables written."""
+        by_table = {}
+        for e in entries:
+            by_table.setdefault(e["table"], []).append(e["row"])
+        t0 = time.perf_counter()
+        with self.pool.connection() as conn:
+            for table, rows in by_table.items():
+                schema.insert(conn, table, rows)
+            conn.execute("UPDATE write_queue_state SET applied_seq = MAX(applied_seq, ?)", (entries[-1]["seq"],))
+        self._commit_ms.append(1000 * (time.perf_counter() - t0))
+        return set(by_table)
+
+    def _reject(self, entry, error):
+        with open(self.journal_path + ".rejected", "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(entry, error=str(error)), default=str) + "\n")
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE write_queue_state SET applied_seq = MAX(applied_seq, ?)", (entry["seq"],))
+
+    def _write(self, batch):
+        """Commit a batch, retrying with backoff, then row by row. Returns the tables written."""
+        for attempt in range(RETRIES_BEFORE_SPLIT):
+            try:
+                return self._apply(batch)
+            except Exception as e:
+                self._record(retries=1, last_error=f"{type(e).__name__}: {e}")
+                if self._stop.wait(min(BACKOFF_CAP_S, BACKOFF_S * 2 ** attempt)):
+                    return set()  # closing: the rows stay in the journal for the next start
+        tables = set()
+        for entry in batch:
+            try:
+                tables |= self._apply([entry])
+            except Exception as e:
+                self._reject(entry, e)
+                self._record(rejected=1, last_error=f"{type(e).__name__}: {e}")
+        return tables
+
+    def _record(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._stats[k] = v if k == "last_error" else self._stats[k] + v
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            tables = self._write(batch)
+            if self._stop.is_set() and not tables:
+                break
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["committed"] += len(batch)
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                if self._queue.empty() and self._last_seq == batch[-1]["seq"]:
+                    self._journal.truncate(0)  # everything journaled is applied
+            with self._applied:
+                self._applied_seq = batch[-1]["seq"]
+                self._applied.notify_all()
+            if tables and self.on_commit:
+                try:
+                    self.on_commit(tables)
+                except Exception as e:
+                    self._record(last_error=f"on_commit: {type(e).__name__}: {e}")
+
+    def close(self, timeout=5):
+        """Stop the writer after draining what it can within timeout."""
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        with self._lock:
+            self._journal.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        latencies = list(self._commit_ms)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "submitted": s["submitted"],
+            "committed": s["committed"] - s["rejected"],
+            "rejected": s["rejected"],
+            "replayed": s["replayed"],
+            "batches": s["batches"],
+            "avg_batch": s["committed"] / s["batches"] if s["batches"] else 0.0,
+            "max_batch": s["max_batch"],
+            "retries": s["retries"],
+            "avg_ack_ms": 1000 * s["ack_s"] / s["submitted"] if s["submitted"] else 0.0,
+            "commit_p50_ms": _percentile(latencies, 0.50),
+            "commit_p95_ms": _percentile(latencies, 0.95),
+            "commit_max_ms": max(latencies, default=0.0),
+            "last_error": s["last_error"],
+        }